@@ -1,9 +1,20 @@
 import streamlit as st
-import google.generativeai as genai
-from pypdf import PdfReader
 import pandas as pd
-import json
+import io
+import hashlib
 import time
+from rate_limiter import RateLimiter, estimate_tokens
+from retry import CircuitBreaker, ScoringFailed
+from screener import EXTRACT_TIMEOUT, EXTRACTOR_VERSION, MAX_IN_FLIGHT, MODEL_NAME, TOKENS_PER_PAGE, configure, estimate_run, page_count
+from prompt_budget import RESUME_TOKENS, fit_resume
+from embeddings import GeminiEmbedder, HashingEmbedder
+from jobs import MAX_JOBS, Job, JobRunner, Services, polish_emails, restore_job, resume_files, screen_files, screen_roles
+import checkpoints
+from response_cache import normalized_hash
+import talent_pool
+from email_templates import DEFAULT_PATH as EMAIL_TEMPLATES_PATH, DEFAULT_SENDER, TemplateStore, render, role_title
+from text_cache import DEFAULT_DIR, DEFAULT_MAX_BYTES, TextCache
+import response_cache
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -35,49 +46,141 @@ if not check_password():
     st.stop()
 
 # --- API SETUP ---
+@st.cache_resource
+def configure_gemini(api_key):
+    # Once per process, not per rerun, so the SDK's connections stay warm
+    configure(api_key)
+
 try:
-    api_key = st.secrets["GEMINI_API_KEY"]
-    genai.configure(api_key=api_key)
+    configure_gemini(st.secrets["GEMINI_API_KEY"])
 except:
     st.error("Secrets missing.")
     st.stop()
 
-# --- FUNCTIONS ---
-def get_pdf_text(pdf_file):
-    text = ""
+@st.cache_resource
+def get_rate_limiter():
+    # Shared by every session: the quota belongs to the API key, not the browser tab.
+    return RateLimiter.for_model(
+        MODEL_NAME,
+        rpm=st.secrets.get("GEMINI_RPM"),
+        tpm=st.secrets.get("GEMINI_TPM"),
+    )
+
+@st.cache_resource
+def get_text_cache():
+    return TextCache(
+        st.secrets.get("TEXT_CACHE_DIR", DEFAULT_DIR),
+        st.secrets.get("TEXT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES),
+        EXTRACTOR_VERSION,
+    )
+
+@st.cache_resource
+def get_response_cache():
+    return response_cache.ResponseCache(
+        st.secrets.get("RESPONSE_CACHE_PATH", response_cache.DEFAULT_PATH),
+        st.secrets.get("RESPONSE_CACHE_TTL", response_cache.DEFAULT_TTL),
+        st.secrets.get("RESPONSE_CACHE_MAX_ENTRIES", response_cache.DEFAULT_MAX_ENTRIES),
+    )
+
+@st.cache_resource
+def get_circuit_breaker():
+    # Process-wide like the rate limiter, so one tripped breaker pauses every batch
+    return CircuitBreaker()
+
+@st.cache_resource
+def get_embedder():
+    # EMBEDDER = "hashing" in secrets swaps in the offline stand-in
+    return HashingEmbedder() if st.secrets.get("EMBEDDER") == "hashing" else GeminiEmbedder()
+
+@st.cache_resource
+def get_talent_pool():
+    # None when the pool holds another embedder's vectors (EMBEDDER changed); the app runs without it
     try:
-        pdf_reader = PdfReader(pdf_file)
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-    except:
+        return talent_pool.TalentPool(st.secrets.get("TALENT_POOL_DIR", talent_pool.DEFAULT_DIR), get_embedder().name)
+    except ValueError:
         return None
-    return text
-
-def analyze_candidate_json(resume_text, job_description):
-    """Asks Gemini for a JSON response to allow sorting/filtering."""
-    model = genai.GenerativeModel('gemini-1.5-flash', generation_config={"response_mime_type": "application/json"})
-    
-    prompt = f"""
-    Act as a Technical Recruiter. Analyze this resume against the JD.
-    Return a valid JSON object with these exact keys:
-    {{
-        "candidate_name": "Name or 'Unknown'",
-        "match_score": 0,  // Integer 0-100
-        "years_experience": "Estimate from text",
-        "key_skills": ["Skill1", "Skill2", "Skill3"],
-        "summary": "2 sentence executive summary",
-        "red_flags": "Any concerns or 'None'",
-        "email_draft": "Write a short email to the candidate inviting them for an interview"
-    }}
-
-    RESUME: {resume_text}
-    JOB DESC: {job_description}
+
+@st.cache_resource
+def get_job_runner():
+    # One pool per process: jobs keep running across reruns, refreshes and dropped websockets
+    return JobRunner(st.secrets.get("MAX_JOBS", MAX_JOBS))
+
+@st.cache_resource
+def get_job_store():
+    return checkpoints.JobStore(st.secrets.get("JOB_DB_PATH", checkpoints.DEFAULT_PATH))
+
+@st.cache_resource
+def get_email_templates():
+    return TemplateStore(st.secrets.get("EMAIL_TEMPLATES_PATH", EMAIL_TEMPLATES_PATH))
+
+def get_services():
+    return Services(
+        get_rate_limiter(),
+        get_circuit_breaker(),
+        get_text_cache(),
+        get_response_cache(),
+        get_embedder(),
+        get_talent_pool(),
+        st.secrets.get("MAX_IN_FLIGHT", MAX_IN_FLIGHT),
+        st.secrets.get("EXTRACT_TIMEOUT", EXTRACT_TIMEOUT),
+        get_job_store(),
+        st.secrets.get("BATCH_TOKENS", 0),
+    )
+
+# --- FUNCTIONS ---
+@st.cache_data(max_entries=10_000, show_spinner=False)
+def resume_tokens(data):
+    """Prompt tokens a resume will take: exact when its text is cached, else from its page count."""
+    extraction = get_text_cache().get(data)
+    if extraction and extraction["text"]:
+        return estimate_tokens(fit_resume(extraction["text"])[0])
+    return min(RESUME_TOKENS, page_count(data) * TOKENS_PER_PAGE)
+
+def start_job(job, fn, *args):
+    """Hands the job to the background runner and remembers it for this browser tab."""
+    job_id = get_job_runner().submit(job, fn, *args)
+    st.session_state['job_id'] = job_id
+    st.session_state.pop('loaded_job', None)
+    st.query_params['job'] = job_id # A refresh or reconnect re-attaches through the URL
+    st.rerun()
+
+def drop_removed_files():
+    """Uploader callback: rows of files taken out of the uploader leave the leaderboard without a re-run.
+
+    A removed file whose copy is still uploaded hands its row to that copy.
     """
-    try:
-        response = model.generate_content(prompt)
-        return json.loads(response.text)
-    except Exception as e:
-        return None
+    current = {file.name for file in st.session_state['uploads'] or []}
+    removed = st.session_state.get('uploaded_names', set()) - current
+    if removed:
+        rows = []
+        for row in st.session_state['results_data']:
+            copies = [name for name in row.get('duplicate_files', []) if name not in removed]
+            if row['filename'] in removed:
+                if not copies:
+                    continue
+                row = {**row, 'filename': copies.pop(0)}
+            if 'duplicate_files' in row:
+                row = {**row, 'duplicate_files': copies}
+            rows.append(row)
+        st.session_state['results_data'] = rows
+        st.session_state['retry_queue'] = [name for name in st.session_state['retry_queue'] if name not in removed]
+    st.session_state['uploaded_names'] = current
+
+@st.fragment(run_every=1)
+def show_progress(job):
+    """Polls the running job without rerunning the whole script; one full rerun once it ends."""
+    st.progress(job.progress)
+    st.text(job.message)
+    if job.pipeline and job.pipeline.stages:
+        with st.expander("Pipeline stages"):
+            st.dataframe(
+                pd.DataFrame(job.pipeline.stats()),
+                use_container_width=True,
+                hide_index=True,
+                column_config={"busy": st.column_config.ProgressColumn("Busy", format="percent", min_value=0, max_value=1)},
+            )
+    if not job.active:
+        st.rerun()
 
 # --- UI LAYOUT ---
 st.title("🚀 Resume Screener Pro")
@@ -86,39 +189,149 @@ st.markdown("#### The Leaderboard Edition")
 # Session State to hold results so they don't disappear on refresh
 if 'results_data' not in st.session_state:
     st.session_state['results_data'] = []
+if 'retry_queue' not in st.session_state:
+    st.session_state['retry_queue'] = []
+if 'role_results' not in st.session_state:
+    st.session_state['role_results'] = None
+
+# Re-attach to this tab's job (or the one in the URL after a refresh) and take its results once it ends;
+# after a restart the job comes back from its checkpoints
+job_id = st.session_state.get('job_id') or st.query_params.get('job')
+job = (get_job_runner().get(job_id) or get_job_runner().keep(restore_job(get_job_store(), job_id))) if job_id else None
+if job_id and not job:
+    st.warning(f"Job {job_id} is no longer available.")
+    st.session_state.pop('job_id', None)
+    st.query_params.pop('job', None)
+elif job:
+    st.session_state['job_id'] = job.id
+    if not job.active and st.session_state.get('loaded_job') != job.id:
+        st.session_state['loaded_job'] = job.id
+        if job.kind == 'roles':
+            st.session_state['role_results'] = job.role_results
+        else:
+            st.session_state['results_data'] = job.results
+            st.session_state['results_jd'] = job.job_description # Emails are drafted against it later
+            st.session_state['retry_queue'] = job.retry_queue
+            st.session_state['content_hashes'] = job.hashes
 
 col1, col2 = st.columns([1, 2])
 
 with col1:
     st.info("1. Setup Job Context")
-    job_description = st.text_area("Paste Job Description", height=200, placeholder="Paste JD here...")
+    multi_role = st.toggle("Screen against several open roles")
+    if multi_role:
+        roles_df = st.data_editor(
+            pd.DataFrame({'role': ["", ""], 'job_description': ["", ""]}),
+            num_rows="dynamic",
+            use_container_width=True,
+            key="roles",
+            column_config={"job_description": st.column_config.TextColumn("Job Description", width="large")},
+        )
+        roles = []
+        for i, row in enumerate(roles_df.itertuples()):
+            if row.job_description and row.job_description.strip():
+                title = (row.role or "").strip() or f"Role {i + 1}"
+                if title in dict(roles):
+                    title = f"{title} ({i + 1})"
+                roles.append((title, row.job_description))
+        top_per_role = st.number_input("Gemini-score the top K candidates per role", min_value=1, value=5, step=1)
+        job_description = ""
+    else:
+        job_description = st.text_area("Paste Job Description", height=200, placeholder="Paste JD here...")
+        with st.expander("Local pre-ranking (saves API calls)"):
+            rank_by = st.radio(
+                "Rank by",
+                ['local_score', 'semantic_score'],
+                format_func={'local_score': "Keywords (BM25)", 'semantic_score': "Meaning (embeddings)"}.get,
+                horizontal=True,
+            )
+            semantic = st.checkbox("Add semantic similarity column", value=rank_by == 'semantic_score',
+                                   disabled=rank_by == 'semantic_score')
+            top_k = st.number_input("Only send the top K resumes to Gemini (0 = all)", min_value=0, value=0, step=1)
+            min_local_score = st.slider(
+                "Minimum local score (keywords: % of the best resume, meaning: cosine x 100)", 0, 100, 0
+            )
     
 with col2:
     st.info("2. upload Candidates")
-    uploaded_files = st.file_uploader("Upload Resumes (PDF)", type=['pdf'], accept_multiple_files=True)
+    uploaded_files = st.file_uploader("Upload Resumes (PDF)", type=['pdf'], accept_multiple_files=True,
+                                      key="uploads", on_change=drop_removed_files)
+    st.session_state['uploaded_names'] = {file.name for file in uploaded_files or []}
+    add_to_pool = st.checkbox("Save screened resumes to the talent pool", value=get_talent_pool() is not None,
+                              disabled=get_talent_pool() is None)
+    
+    running = bool(job and job.active)
+    
+    if uploaded_files and job_description and not multi_role:
+        input_tokens, output_tokens, cost = estimate_run(
+            [resume_tokens(file.getvalue()) for file in uploaded_files], job_description, top_k
+        )
+        st.caption(f"Estimate before any call: up to {input_tokens:,} prompt + {output_tokens:,} output tokens "
+                   f"(≈ ${cost:.4f}) for {min(len(uploaded_files), top_k or len(uploaded_files))} Gemini calls")
     
-    if st.button("Start Analysis", type="primary"):
-        if not uploaded_files or not job_description:
+    if st.button("Start Analysis", type="primary", disabled=running):
+        if multi_role:
+            if not uploaded_files or not roles:
+                st.warning("Missing files or roles.")
+            else:
+                st.session_state['retry_queue'] = [] # Only single-JD jobs can be retried
+                start_job(Job('roles', len(uploaded_files)), screen_roles,
+                          [(file.name, file.getvalue()) for file in uploaded_files], roles, top_per_role, get_services())
+        elif not uploaded_files or not job_description:
             st.warning("Missing files or JD.")
         else:
-            st.session_state['results_data'] = [] # Reset
-            progress_bar = st.progress(0)
-            status = st.empty()
-            
-            for i, file in enumerate(uploaded_files):
-                status.text(f"Analyzing {file.name}...")
-                text = get_pdf_text(file)
-                
-                if text:
-                    data = analyze_candidate_json(text, job_description)
-                    if data:
-                        data['filename'] = file.name # Add filename for reference
-                        st.session_state['results_data'].append(data)
-                
-                progress_bar.progress((i + 1) / len(uploaded_files))
-                time.sleep(4) # Rate limit safety
-            
-            status.success("Analysis Complete!")
+            # Rows scored for the same JD and settings are kept; only new or changed files are processed
+            settings = [normalized_hash(job_description), top_k, min_local_score, rank_by, semantic or rank_by == 'semantic_score']
+            known = {}
+            if st.session_state.get('screened_settings') == settings:
+                hashes = st.session_state.get('content_hashes', {})
+                known = {
+                    hashes[row['filename']]: row for row in st.session_state['results_data'] if row['filename'] in hashes
+                }
+            payload = [(file.name, file.getvalue()) for file in uploaded_files]
+            if known and all(hashlib.sha256(data).hexdigest() in known for _, data in payload):
+                st.info("Every uploaded resume is already scored for this JD.")
+            else:
+                if not known:
+                    st.session_state['results_data'] = [] # Reset
+                st.session_state['retry_queue'] = []
+                st.session_state['screened_settings'] = settings
+                start_job(Job('files', len(payload), job_description), screen_files, payload, job_description,
+                          get_services(), *settings[1:], add_to_pool, known)
+    
+    if running:
+        show_progress(job)
+    elif job:
+        if job.status == "failed":
+            st.error(f"Analysis failed: {job.error}")
+        elif job.status == "interrupted":
+            st.warning(job.message)
+        else:
+            st.success(job.message)
+        for note in job.notes:
+            st.caption(note)
+        if job.kind == 'files' and job.status in ("failed", "interrupted"):
+            if st.button("Resume job", help="Only the files that were not finished are processed"):
+                job.update(status="queued", finished=None, error=None)
+                start_job(job, resume_files, get_services())
+    
+    if st.session_state['retry_queue'] and job and job.kind == 'files' and not running:
+        st.warning(f"{len(st.session_state['retry_queue'])} files could not be scored: {', '.join(st.session_state['retry_queue'])}")
+        if st.button("Retry Failed Files"):
+            get_job_store().retry_failed(job.id)
+            job.update(status="queued", finished=None, error=None, retry_queue=[])
+            start_job(job, resume_files, get_services())
+    
+    interrupted = [row for row in get_job_store().interrupted() if not get_job_runner().get(row[0]) and row[0] != job_id]
+    if interrupted and not running:
+        with st.expander(f"⏸️ Interrupted jobs ({len(interrupted)})"):
+            for interrupted_id, created, files, finished in interrupted:
+                c1, c2 = st.columns([3, 1])
+                c1.write(f"Started {time.strftime('%Y-%m-%d %H:%M', time.localtime(created))}: "
+                         f"{finished} of {files} files finished")
+                if c2.button("Resume job", key=f"resume-{interrupted_id}"):
+                    start_job(get_job_runner().keep(restore_job(get_job_store(), interrupted_id)), resume_files,
+                              get_services())
 
 # --- DISPLAY RESULTS (The Upgrade) ---
 if st.session_state['results_data']:
@@ -129,21 +342,64 @@ if st.session_state['results_data']:
     df = pd.DataFrame(st.session_state['results_data'])
     
     # Reorder columns for neatness
-    display_cols = ['candidate_name', 'match_score', 'years_experience', 'red_flags', 'filename']
+    display_cols = ['candidate_name', 'match_score', 'local_score', 'semantic_score', 'llm_scored',
+                    'years_experience', 'red_flags', 'filename', 'duplicate_files', 'pages_read', 'pages_total']
+    display_cols = [col for col in display_cols if col in df.columns] # Pre-ranking columns are optional
+    sort_cols = [col for col in ['match_score', 'semantic_score', 'local_score'] if col in df.columns]
     
-    # Show Sortable Table
-    st.dataframe(
-        df[display_cols].sort_values(by='match_score', ascending=False),
+    # Show Sortable Table; selected rows are the shortlist to draft emails for
+    leaderboard = df[display_cols].sort_values(by=sort_cols, ascending=False, na_position='last')
+    selection = st.dataframe(
+        leaderboard,
         use_container_width=True,
         hide_index=True,
+        key="leaderboard",
+        on_select="rerun",
+        selection_mode="multi-row",
         column_config={
             "match_score": st.column_config.ProgressColumn(
                 "Match Score", format="%d", min_value=0, max_value=100
             ),
+            "local_score": st.column_config.NumberColumn("Keyword Score", format="%.1f"),
+            "semantic_score": st.column_config.NumberColumn("Semantic Score", format="%.1f"),
+            "llm_scored": st.column_config.CheckboxColumn("LLM Scored"),
+            "duplicate_files": st.column_config.ListColumn("Also Submitted As"),
         }
     )
     
+    # Emails are rendered locally from a template; Gemini only polishes the ones a recruiter asks for
+    templates = get_email_templates()
+    with st.expander("✉️ Email template"):
+        saved_templates = templates.all()
+        t1, t2, t3 = st.columns(3)
+        template_name = t1.selectbox("Template", list(saved_templates))
+        role = t2.text_input("Role title", value=role_title(st.session_state.get('results_jd', "")))
+        sender = t3.text_input("Signed by", value=DEFAULT_SENDER)
+        template = st.text_area(
+            "Text ({first_name}, {candidate_name}, {role}, {top_skills}, {skill}, {years_experience} "
+            "and {sender} are filled in per candidate)",
+            saved_templates[template_name],
+            height=180,
+            key=f"template-{template_name}",
+        )
+        s1, s2 = st.columns([3, 1])
+        save_as = s1.text_input("Save as", value=template_name, label_visibility="collapsed")
+        if s2.button("💾 Save template"):
+            templates.save(save_as.strip() or template_name, template)
+            st.rerun()
+    
+    shortlist = [st.session_state['results_data'][i] for i in leaderboard.index[selection.selection.rows]]
+    if shortlist and st.button(f"✨ Polish emails for {len(shortlist)} selected candidates with Gemini"):
+        with st.spinner("Polishing emails..."):
+            failed = polish_emails(shortlist, template, role, sender, st.session_state.get('results_jd', ""), get_services())
+        if failed:
+            st.warning(f"{failed} emails could not be polished; try again in a moment.")
+    
     # Download Button (The "Money" Feature)
+    df['email_draft'] = [
+        row.get('email_draft') or render(template, row, role, sender) if row.get('llm_scored', True) else None
+        for row in st.session_state['results_data']
+    ]
     csv = df.to_csv(index=False).encode('utf-8')
     st.download_button(
         "📥 Download Report (CSV)",
@@ -157,15 +413,97 @@ if st.session_state['results_data']:
     st.divider()
     st.subheader("📝 Detailed Breakdown")
     
-    for candidate in st.session_state['results_data']:
+    for i, candidate in enumerate(st.session_state['results_data']):
+        if not candidate.get('llm_scored', True):
+            continue # Filtered out locally, nothing to break down
         with st.expander(f"{candidate['match_score']}% - {candidate['candidate_name']}"):
             c1, c2 = st.columns(2)
             with c1:
                 st.write(f"**Experience:** {candidate['years_experience']}")
                 st.write(f"**Skills:** {', '.join(candidate['key_skills'])}")
+                st.write(f"**Pages read:** {candidate['pages_read']}/{candidate['pages_total']}")
+                if candidate.get('duplicate_files'):
+                    st.write(f"**Also submitted as:** {', '.join(candidate['duplicate_files'])}")
             with c2:
                 st.write(f"**Summary:** {candidate['summary']}")
                 st.error(f"**Red Flags:** {candidate['red_flags']}")
+            if candidate.get('prompt_cuts'):
+                st.caption(f"✂️ Trimmed to fit the prompt budget: {'; '.join(candidate['prompt_cuts'])}")
             
-            st.text_area("Draft Email", candidate['email_draft'], height=100)
+            if st.button("✨ Polish with Gemini", key=f"polish-{i}"):
+                with st.spinner("Polishing email..."):
+                    if polish_emails([candidate], template, role, sender, st.session_state.get('results_jd', ""), get_services()):
+                        st.warning("The email could not be polished right now; try again in a moment.")
+            email = candidate.get('email_draft') or render(template, candidate, role, sender)
+            # Keyed by content, so a new template or a polished version replaces the text shown
+            st.text_area("Draft Email", email, height=180, key=f"email-{i}-{hashlib.sha256(email.encode()).hexdigest()[:8]}")
 
+# --- MULTI-ROLE RESULTS ---
+if st.session_state['role_results']:
+    st.divider()
+    st.subheader("🏆 Leaderboards by Role")
+    leaderboards = st.session_state['role_results']['leaderboards']
+    for tab, (title, rows) in zip(st.tabs(list(leaderboards)), leaderboards.items()):
+        with tab:
+            if not rows:
+                st.info("No candidates were scored for this role.")
+                continue
+            board = pd.DataFrame(rows)
+            columns = ['candidate_name', 'match_score', 'semantic_score', 'years_experience', 'red_flags', 'filename',
+                       'duplicate_files']
+            st.dataframe(
+                board[[col for col in columns if col in board.columns]].sort_values(by='match_score', ascending=False),
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "match_score": st.column_config.ProgressColumn(
+                        "Match Score", format="%d", min_value=0, max_value=100
+                    ),
+                    "duplicate_files": st.column_config.ListColumn("Also Submitted As"),
+                }
+            )
+    
+    st.subheader("📊 Candidate x Role Grid")
+    grid = st.session_state['role_results']['grid']
+    st.dataframe(grid, use_container_width=True, hide_index=True)
+    parquet = io.BytesIO()
+    grid.to_parquet(parquet, index=False)
+    c1, c2 = st.columns(2)
+    with c1:
+        st.download_button("📥 Download Grid (CSV)", grid.to_csv(index=False).encode('utf-8'),
+                           "role_grid.csv", "text/csv", key='download-grid-csv')
+    with c2:
+        st.download_button("📥 Download Grid (Parquet)", parquet.getvalue(),
+                           "role_grid.parquet", "application/octet-stream", key='download-grid-parquet')
+
+# --- TALENT POOL ---
+st.divider()
+pool = get_talent_pool()
+if pool is None:
+    st.warning(
+        "The talent pool was built with a different embedder than the EMBEDDER secret selects, so it is "
+        "disabled. Restore the setting, or point TALENT_POOL_DIR at a new directory to start another pool."
+    )
+else:
+    with st.expander(f"🗂️ Talent Pool Search ({len(pool)} resumes screened so far)"):
+        pool_jd = st.text_area("Paste a new Job Description", height=150, key="pool_jd")
+        pool_k = st.number_input("Number of matches", min_value=1, max_value=500, value=20)
+        if st.button("Search Talent Pool") and pool_jd:
+            try:
+                matches = pool.search(get_embedder().embed([pool_jd], "retrieval_query")[0], pool_k)
+            except ScoringFailed as exc:
+                st.error(f"Search failed: the embedding API kept failing ({exc.kind}). Try again in a minute.")
+                matches = None
+            if matches:
+                st.dataframe(
+                    pd.DataFrame(matches),
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        "similarity": st.column_config.ProgressColumn(
+                            "Similarity", format="%.1f", min_value=0, max_value=100
+                        ),
+                    }
+                )
+            elif matches is not None:
+                st.info("The talent pool is empty.")
@@ -0,0 +1,58 @@
+"""Several resumes per Gemini request, answered as one JSON array keyed by resume ID.
+
+For short CVs the instructions, the JD and the per-request overhead outweigh the
+resume itself; packing resumes up to a token budget pays for them once per batch.
+"""
+from response_schema import validate_analysis
+from screener import INSTRUCTIONS
+
+BATCH_TOKENS = 8_000 # Resume tokens packed into one request; output grows with it too
+MAX_BATCH = 10 # Resumes per request, whatever their size
+BATCH_LINGER = 0.2 # Seconds a partial batch waits for its next resume before it is sent
+
+BATCH_NOTE = """
+    The message holds several resumes, each introduced by a line "RESUME <id>:".
+    Judge every resume on its own and return a JSON array with one such object per
+    resume, each with an extra "resume_id" key holding that resume's id.
+"""
+
+
+def resume_ids(count):
+    """IDs for the resumes of one batch, in order: R1, R2, ..."""
+    return [f"R{i + 1}" for i in range(count)]
+
+
+def batch_prompt(resumes):
+    """The per-batch part of the prompt for [(resume_id, text)], for use with a cached JD."""
+    return BATCH_NOTE + "".join(f"\n    RESUME {resume_id}: {text}\n" for resume_id, text in resumes)
+
+
+def build_batch_prompt(resumes, job_description):
+    """Like screener.build_prompt, for several resumes at once."""
+    return INSTRUCTIONS + batch_prompt(resumes) + f"""
+    JOB DESC: {job_description}
+    """
+
+
+def split_batch(data, ids):
+    """{resume_id: record} for every well-formed record of a batch reply; IDs left out need a single call.
+
+    A record counts when it is an object for one of `ids` (first one wins) that passes
+    response_schema.validate_analysis, coercions included.
+    """
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list):
+        return {}
+    wanted = set(ids)
+    records = {}
+    for record in data:
+        if not isinstance(record, dict):
+            continue
+        resume_id = str(record.pop("resume_id", ""))
+        if resume_id not in wanted or resume_id in records:
+            continue
+        record, errors = validate_analysis(record)
+        if not errors:
+            records[resume_id] = record
+    return records
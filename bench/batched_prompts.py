@@ -0,0 +1,69 @@
+"""Requests and tokens per resume with one resume per request versus batched prompts.
+
+Run from the repo root: python -m bench.batched_prompts [--resumes 200] [--batch-tokens 8000] [--mangle-rate 0.05]
+
+Tokens are counted by the local stand-in at ~4 characters each: prompt tokens it
+received plus output tokens it sent. --mangle-rate drops that share of records
+from batch replies, so the single-resume fallback shows up in the numbers.
+"""
+import argparse
+import asyncio
+import time
+
+import screener
+from batching import BATCH_TOKENS, MAX_BATCH
+from bench import corpus
+from bench.mock_gemini import MockGeminiServer
+from pipeline import Pipeline
+from rate_limiter import RateLimiter
+
+
+def run(server, files, job_description, batch_tokens, args):
+    requests, prompt_tokens, output_tokens = server.requests, server.prompt_tokens, server.output_tokens
+    pipeline = Pipeline(
+        job_description, RateLimiter(100_000, 100_000_000), args.concurrency,
+        context_cache=False, batch_tokens=batch_tokens, max_batch=args.max_batch,
+    )
+    scored = []
+    start = time.perf_counter()
+    asyncio.run_coroutine_threadsafe(
+        pipeline.run(files, lambda key, event, value: event == "scored" and scored.append(key)),
+        screener.get_event_loop(),
+    ).result()
+    elapsed = time.perf_counter() - start
+    return {
+        "scored": len(scored),
+        "seconds": round(elapsed, 2),
+        "requests_per_resume": round((server.requests - requests) / len(files), 3),
+        "prompt_tokens_per_resume": round((server.prompt_tokens - prompt_tokens) / len(files)),
+        "output_tokens_per_resume": round((server.output_tokens - output_tokens) / len(files)),
+        "batches": pipeline.batch_stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resumes", type=int, default=200)
+    parser.add_argument("--max-pages", type=int, default=2)
+    parser.add_argument("--batch-tokens", type=int, default=BATCH_TOKENS)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--mangle-rate", type=float, default=0.05, help="Share of batch records the stand-in drops")
+    parser.add_argument("--latency", type=float, default=0.05, help="Median seconds per Gemini call")
+    parser.add_argument("--concurrency", type=int, default=screener.MAX_IN_FLIGHT)
+    args = parser.parse_args()
+
+    files = corpus.generate(args.resumes, 1, args.max_pages)
+    job_description = "Senior Python backend engineer with SQL and Docker. " * 20
+    server = MockGeminiServer(latency=args.latency, mangle_rate=args.mangle_rate).start()
+    try:
+        screener.configure("test", transport="rest", api_endpoint=server.url)
+        for label, batch_tokens in (("one per request", 0), ("batched", args.batch_tokens)):
+            report = run(server, files, job_description, batch_tokens, args)
+            print(f"{label:>16}: " + ", ".join(f"{key} {value}" for key, value in report.items()))
+    finally:
+        server.stop()
+        screener.shutdown_extraction_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Synthetic resume PDFs for benchmarks, written without any PDF library."""
+import random
+
+FIRST_NAMES = ["Jane", "Omar", "Priya", "Wei", "Lucas", "Amara", "Sofia", "Kenji", "Ana", "Noah"]
+LAST_NAMES = ["Doe", "Haddad", "Patel", "Chen", "Silva", "Okafor", "Rossi", "Tanaka", "Lopez", "Berg"]
+ROLES = ["Backend Engineer", "Data Engineer", "Frontend Developer", "SRE", "ML Engineer"]
+SKILLS = ["Python", "SQL", "Docker", "Kubernetes", "AWS", "React", "Go", "Terraform", "Spark", "Java"]
+LINES_PER_PAGE = 45
+
+
+def make_pdf(pages):
+    """A minimal valid PDF with one Helvetica text page per entry (lines split on newlines)."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>")
+    font = 3 + 2 * len(pages)
+    for i, text in enumerate(pages):
+        escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        lines = " ".join(f"({line}) Tj T*" for line in escaped.split("\n"))
+        stream = f"BT /F1 10 Tf 14 TL 50 760 Td {lines} ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font} 0 R >> >> >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return out.encode("latin-1")
+
+
+def synthetic_resume(rng, pages):
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    lines = [name, rng.choice(ROLES), f"Skills: {', '.join(rng.sample(SKILLS, 4))}"]
+    while len(lines) < pages * LINES_PER_PAGE:
+        lines.append(
+            f"{rng.randint(2008, 2024)} - {rng.choice(ROLES)} using {rng.choice(SKILLS)} and {rng.choice(SKILLS)}"
+        )
+    return ["\n".join(lines[i:i + LINES_PER_PAGE]) for i in range(0, len(lines), LINES_PER_PAGE)]
+
+
+def generate(count, min_pages=1, max_pages=6, seed=0):
+    """Returns [(filename, pdf_bytes)], the same shape as the uploader's (name, getvalue())."""
+    rng = random.Random(seed)
+    return [
+        (f"resume_{i:05d}.pdf", make_pdf(synthetic_resume(rng, rng.randint(min_pages, max_pages))))
+        for i in range(count)
+    ]
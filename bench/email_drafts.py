@@ -0,0 +1,94 @@
+"""Scoring latency and output tokens with Gemini writing every email versus local templates.
+
+Run from the repo root: python -m bench.email_drafts [--resumes 100] [--shortlist 0.1] [--token-latency 0.005]
+
+"eager" is the old prompt, which had Gemini write an invite for every resume. "template"
+scores without one, renders every email from a template locally and has Gemini polish the
+top --shortlist share, as a recruiter asking for polish on a shortlist would. The stand-in
+spends --token-latency seconds per output token, so a longer reply is a slower one, as
+with the real model.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import screener
+from bench import corpus
+from bench.mock_gemini import MockGeminiServer
+from email_templates import DEFAULT_TEMPLATES, render
+from jobs import Services, polish_emails
+from pipeline import Pipeline
+from rate_limiter import RateLimiter
+from retry import CircuitBreaker
+
+EAGER_INSTRUCTIONS = screener.INSTRUCTIONS.replace(
+    '"red_flags": "Any concerns or \'None\'"',
+    '"red_flags": "Any concerns or \'None\'",\n        "email_draft": "Write a short email to the candidate inviting them for an interview"',
+)
+
+
+def score(files, job_description, args):
+    """(rows, per-resume seconds until the row was ready) for one pipeline run."""
+    pipeline = Pipeline(job_description, RateLimiter(100_000, 100_000_000), args.concurrency, context_cache=False)
+    rows, latencies = [], []
+
+    def sink(key, event, value):
+        if event == "scored":
+            rows.append(value)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    asyncio.run_coroutine_threadsafe(pipeline.run(files, sink), screener.get_event_loop()).result()
+    return rows, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resumes", type=int, default=100)
+    parser.add_argument("--shortlist", type=float, default=0.1, help="Share of candidates that get an email")
+    parser.add_argument("--latency", type=float, default=0.3, help="Median seconds per Gemini call before output")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Seconds per output token")
+    parser.add_argument("--concurrency", type=int, default=screener.MAX_IN_FLIGHT)
+    args = parser.parse_args()
+
+    files = corpus.generate(args.resumes, 1, 2)
+    job_description = "Senior Python backend engineer with SQL and Docker"
+    server = MockGeminiServer(latency=args.latency, token_latency=args.token_latency).start()
+    instructions = screener.INSTRUCTIONS
+    try:
+        screener.configure("test", transport="rest", api_endpoint=server.url)
+        template = DEFAULT_TEMPLATES["Interview invite"]
+        for label in ("eager", "template"):
+            screener.INSTRUCTIONS = EAGER_INSTRUCTIONS if label == "eager" else instructions
+            output_tokens, requests = server.output_tokens, server.requests
+            rows, latencies = score(files, job_description, args)
+            scoring_tokens = server.output_tokens - output_tokens
+            extra = ""
+            if label == "template":
+                start = time.perf_counter()
+                for row in rows:
+                    render(template, row, "Backend Engineer")
+                render_us = (time.perf_counter() - start) / len(rows) * 1e6
+                shortlist = sorted(rows, key=lambda row: row['match_score'], reverse=True)
+                shortlist = shortlist[:max(1, round(len(rows) * args.shortlist))]
+                services = Services(RateLimiter(100_000, 100_000_000), CircuitBreaker(), None, None,
+                                    max_in_flight=args.concurrency)
+                start = time.perf_counter()
+                polish_emails(shortlist, template, "Backend Engineer", "Recruiting", job_description, services)
+                extra = f"{len(rows)} emails rendered at {render_us:.1f} us each, {len(shortlist)} polished in {time.perf_counter() - start:.2f}s; "
+            print(
+                f"{label:>8}: row ready p50 {statistics.median(latencies) * 1000:.0f} ms, "
+                f"mean {statistics.mean(latencies) * 1000:.0f} ms; "
+                f"scoring output {scoring_tokens / len(files):.0f} tokens/resume; " + extra +
+                f"total output {(server.output_tokens - output_tokens) / len(files):.0f} tokens/resume, "
+                f"{server.requests - requests} requests"
+            )
+    finally:
+        screener.INSTRUCTIONS = instructions
+        server.stop()
+        screener.shutdown_extraction_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Local stand-in for the Gemini REST generateContent endpoint.
+
+Point the SDK at it with screener.configure("test", transport="rest", api_endpoint=server.url).
+Latency is log-normal around `latency` plus `token_latency` per output token, a share of requests can be answered with
+429 RESOURCE_EXHAUSTED, and replies are shaped like analyze_candidate_json_async's schema.
+The cachedContents endpoints are emulated too, so context caching can be exercised;
+usage metadata reports cached tokens the way the real API does. Batched prompts
+("RESUME <id>:" blocks) get a JSON array, with `mangle_rate` of its records dropped;
+email prompts ("CANDIDATE:") get a plain-text invite. `defect_rate` of single-resume
+replies come back with a slip real replies show (see DEFECTS); re-asks for some fields
+get just those fields.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SKILLS = ["Python", "SQL", "Docker", "Kubernetes", "AWS", "React", "Go", "Terraform", "Spark", "Java"]
+# Fixable locally: trailing_comma, percent_score, truncated (mostly); need a re-ask: missing_field, worded_score
+DEFECTS = ("trailing_comma", "percent_score", "truncated", "missing_field", "worded_score")
+
+
+def fake_email(name):
+    """An invite about as long as the ones Gemini writes (~120 tokens)."""
+    return (
+        f"Hi {name},\n\nThank you for applying. We were impressed by your background and would love to "
+        "invite you to a 45-minute video interview with the hiring manager next week. The conversation will "
+        "cover your recent projects, the way you approach system design, and what you are looking for in your "
+        "next role. Please reply with two or three time slots that work for you, and let us know if you need "
+        "any accommodations.\n\nLooking forward to speaking with you,\nThe Recruiting Team"
+    )
+
+
+def fake_analysis(prompt, rng, email=True):
+    """A plausible analyze_candidate_json_async reply, named after the resume's first line."""
+    match = re.search(r"RESUME:\s*(.+)", prompt)
+    name = match.group(1).strip()[:40] if match else "Unknown"
+    analysis = {
+        "candidate_name": name,
+        "match_score": rng.randint(0, 100),
+        "years_experience": str(rng.randint(0, 20)),
+        "key_skills": rng.sample(SKILLS, 3),
+        "summary": "Synthetic candidate. Generated by the local stand-in.",
+        "red_flags": "None",
+    }
+    if email:
+        analysis["email_draft"] = fake_email(name)
+    return analysis
+
+
+def fake_defect(analysis, rng):
+    """`analysis` serialized with one of DEFECTS."""
+    defect = rng.choice(DEFECTS)
+    if defect == "percent_score":
+        analysis = dict(analysis, match_score=f"{analysis['match_score']}%")
+    elif defect == "worded_score":
+        analysis = dict(analysis, match_score="Strong match")
+    elif defect == "missing_field":
+        analysis = {key: value for key, value in analysis.items() if key != "summary"}
+    text = json.dumps(analysis)
+    if defect == "trailing_comma":
+        return text[:-1] + ",}"
+    if defect == "truncated":
+        return text[:int(len(text) * 0.9)]
+    return text
+
+
+def fake_reply(prompt, rng, mangle_rate=0.0, instructions="", defect_rate=0.0):
+    """The reply text: an email, fake_analysis() for one resume, or an array of them for a batch.
+
+    Analyses only carry an email_draft when the instructions (inline or cached) ask for one.
+    """
+    candidate = re.search(r"CANDIDATE:\s*(.+)", prompt)
+    if candidate:
+        return fake_email(candidate.group(1).strip())
+    email = '"email_draft"' in instructions + prompt
+    reask = re.search(r"invalid values for: (.+)\.", prompt)
+    if reask:
+        analysis = fake_analysis(prompt, rng, email)
+        return json.dumps({key: analysis[key] for key in re.findall(r'"(\w+)"', reask.group(1)) if key in analysis})
+    batch = re.findall(r"RESUME (\S+):\s*(.+)", prompt)
+    if not batch:
+        if rng.random() < defect_rate:
+            return fake_defect(fake_analysis(prompt, rng, email), rng)
+        return json.dumps(fake_analysis(prompt, rng, email))
+    return json.dumps([
+        {"resume_id": resume_id, **fake_analysis(f"RESUME: {first_line}", rng, email)}
+        for resume_id, first_line in batch if rng.random() >= mangle_rate
+    ])
+
+
+class MockGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, like the real endpoint
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.stats_lock:
+            self.server.connections += 1
+        time.sleep(self.server.connect_latency) # Stands in for the TLS handshake a real endpoint costs
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.split("?")[0].endswith("/cachedContents"):
+            self._create_cache(json.loads(body))
+            return
+        # Seeded per request body, so the same resume always gets the same reply
+        rng = random.Random(hashlib.sha256(body).digest())
+        with self.server.stats_lock:
+            self.server.requests += 1
+            throttle = self.server.rng.random() < self.server.error_rate
+        time.sleep(self.server.sample_latency())
+        if throttle:
+            with self.server.stats_lock:
+                self.server.throttled += 1
+            self._send(429, {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}})
+            return
+        request = json.loads(body or b"{}")
+        prompt = _text(request.get("contents", []))
+        cached = ""
+        if request.get("cachedContent"):
+            with self.server.stats_lock:
+                cached = self.server.caches.get(request["cachedContent"])
+            if cached is None:
+                self._send(404, {"error": {"code": 404, "message": "CachedContent not found", "status": "NOT_FOUND"}})
+                return
+        text = fake_reply(prompt, rng, self.server.mangle_rate, cached, self.server.defect_rate)
+        sent_tokens = max(1, len(prompt) // 4)
+        cached_tokens = len(cached) // 4
+        output_tokens = max(1, len(text) // 4)
+        time.sleep(output_tokens * self.server.token_latency) # Generation time grows with the reply
+        with self.server.stats_lock:
+            self.server.prompt_tokens += sent_tokens
+            self.server.cached_tokens += cached_tokens
+            self.server.output_tokens += output_tokens
+        usage = {
+            "promptTokenCount": sent_tokens + cached_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": sent_tokens + cached_tokens + output_tokens,
+        }
+        if cached_tokens:
+            usage["cachedContentTokenCount"] = cached_tokens
+        self._send(200, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": 1}],
+            "usageMetadata": usage,
+        })
+
+    def _create_cache(self, request):
+        text = _text([request.get("systemInstruction", {})]) + _text(request.get("contents", []))
+        name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+        with self.server.stats_lock:
+            self.server.caches[name] = text
+            self.server.prompt_tokens += len(text) // 4
+        self._send(200, {
+            "name": name,
+            "model": request.get("model", ""),
+            "displayName": request.get("displayName", ""),
+            "usageMetadata": {"totalTokenCount": len(text) // 4},
+        })
+
+    def do_DELETE(self):
+        with self.server.stats_lock:
+            self.server.caches.pop(self.path.split("?")[0].split("/v1beta/")[-1], None)
+        self._send(200, {})
+
+    def _send(self, status, payload):
+        out = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+def _text(contents):
+    return "".join(part.get("text", "") for content in contents for part in content.get("parts", []))
+
+
+class MockGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.05, jitter=0.0, error_rate=0.0, connect_latency=0.0, seed=0, mangle_rate=0.0,
+                 token_latency=0.0, defect_rate=0.0):
+        super().__init__(("127.0.0.1", port), MockGeminiHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.connect_latency = connect_latency
+        self.mangle_rate = mangle_rate
+        self.token_latency = token_latency
+        self.defect_rate = defect_rate
+        self.rng = random.Random(seed)
+        self.connections = 0
+        self.requests = 0
+        self.throttled = 0
+        self.prompt_tokens = 0 # Prompt tokens that went over the wire, cache creation included
+        self.cached_tokens = 0 # Prompt tokens read from cached content instead
+        self.output_tokens = 0
+        self.caches = {}
+        self.stats_lock = threading.Lock()
+
+    def sample_latency(self):
+        """Log-normal with median `latency`; `jitter` is the sigma of the underlying normal."""
+        if not self.jitter:
+            return self.latency
+        with self.stats_lock:
+            return self.latency * self.rng.lognormvariate(0, self.jitter)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="mock-gemini", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the Gemini API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="Median seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.3, help="Log-normal sigma of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with 429")
+    parser.add_argument("--defect-rate", type=float, default=0.0, help="Share of replies with a malformed field")
+    args = parser.parse_args()
+    server = MockGeminiServer(args.port, args.latency, args.jitter, args.error_rate, defect_rate=args.defect_rate)
+    print(f"Mock Gemini listening on {server.url}")
+    server.serve_forever()
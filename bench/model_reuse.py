@@ -0,0 +1,52 @@
+"""Per-call latency with a fresh SDK client per call versus the shared model registry.
+
+Run from the repo root: python -m bench.model_reuse [--calls 200] [--latency 0.02] [--connect-latency 0.03]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import screener
+from bench.mock_gemini import MockGeminiServer
+
+
+def run(server, calls, reuse):
+    screener.configure("test", transport="rest", api_endpoint=server.url)
+    connections = server.connections
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        if not reuse:
+            # What every Streamlit rerun used to do: reconfigure, then build a new model
+            screener.configure("test", transport="rest", api_endpoint=server.url)
+        asyncio.run_coroutine_threadsafe(
+            screener.analyze_candidate_json_async("resume text", "job description"), screener.get_event_loop()
+        ).result()
+        timings.append(time.perf_counter() - start)
+    return timings, server.connections - connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated server time per call (s)")
+    parser.add_argument("--connect-latency", type=float, default=0.03, help="Simulated TLS setup per new connection (s)")
+    args = parser.parse_args()
+
+    server = MockGeminiServer(latency=args.latency, connect_latency=args.connect_latency).start()
+    try:
+        for label, reuse in (("fresh client per call", False), ("shared registry", True)):
+            timings, connections = run(server, args.calls, reuse)
+            overhead = statistics.mean(timings) - args.latency
+            print(
+                f"{label:>22}: mean {statistics.mean(timings) * 1000:6.2f} ms, "
+                f"p50 {statistics.median(timings) * 1000:6.2f} ms, "
+                f"overhead {overhead * 1000:6.2f} ms/call, {connections} TCP connections"
+            )
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""End-to-end throughput of upload -> extract -> score -> leaderboard against the local stand-in.
+
+Run from the repo root: python -m bench.throughput [--resumes 200] [--latency 0.8] [--error-rate 0.02]
+
+Latency is per resume, from the moment the batch is submitted (the recruiter pressing
+Start Analysis) until that resume's row is ready, so it includes queueing for a slot.
+The per-stage table shows which pipeline stage is the bottleneck (busy near 100%).
+--context-cache registers the JD as cached content whatever its length (the real API
+wants 32k tokens) and --jd-words pads the JD, to compare prompt tokens on the wire.
+--defect-rate makes that share of replies malformed, to see what repairs and re-asks cost.
+"""
+import argparse
+import asyncio
+import json
+import resource
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+import screener
+from bench import corpus
+from bench.mock_gemini import MockGeminiServer
+from pipeline import QUEUE_SIZE, Pipeline
+from rate_limiter import RateLimiter
+from response_schema import STATS as RESPONSE_STATS
+from retry import CircuitBreaker, RetryPolicy
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def peak_rss_mb():
+    """Peak RSS of this process and of the largest extraction worker (ru_maxrss is KiB on Linux)."""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    )
+
+
+def run(files, job_description, args):
+    limiter = RateLimiter(args.rpm, args.tpm)
+    breaker = CircuitBreaker()
+    pipeline = Pipeline(
+        job_description, limiter, args.concurrency, breaker=breaker, queue_size=args.queue_size,
+        context_cache=args.context_cache, min_cache_tokens=0,
+    )
+    latencies = []
+    rows = []
+    failed = []
+
+    def sink(key, event, value):
+        if event == "extracted":
+            return
+        latencies.append(time.perf_counter() - start)
+        if event == "scored":
+            value['filename'] = key
+            rows.append(value)
+        elif event == "failed":
+            failed.append(key)
+
+    start = time.perf_counter()
+    asyncio.run_coroutine_threadsafe(pipeline.run(files, sink), screener.get_event_loop()).result()
+    # Same work the UI does to render the leaderboard
+    display_cols = ['candidate_name', 'match_score', 'years_experience', 'red_flags', 'filename', 'pages_read', 'pages_total']
+    pd.DataFrame(rows)[display_cols].sort_values(by='match_score', ascending=False)
+    elapsed = time.perf_counter() - start
+    return elapsed, latencies, len(rows), len(failed), pipeline.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resumes", type=int, default=200)
+    parser.add_argument("--min-pages", type=int, default=1)
+    parser.add_argument("--max-pages", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.8, help="Median seconds per Gemini call")
+    parser.add_argument("--jitter", type=float, default=0.3, help="Log-normal sigma of the call latency")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Share of calls answered with 429")
+    parser.add_argument("--concurrency", type=int, default=screener.MAX_IN_FLIGHT)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="Items allowed between two stages")
+    parser.add_argument("--rpm", type=int, default=100_000, help="Rate limiter budget (default: effectively off)")
+    parser.add_argument("--tpm", type=int, default=100_000_000)
+    parser.add_argument("--context-cache", action="store_true", help="Cache the JD as Gemini context for the batch")
+    parser.add_argument("--jd-words", type=int, default=0, help="Pad the JD to this many words")
+    parser.add_argument("--defect-rate", type=float, default=0.0, help="Share of replies with a malformed field")
+    parser.add_argument("--json", action="store_true", help="Print the report as one JSON object")
+    args = parser.parse_args()
+
+    # Keep backoff short so injected 429s cost the benchmark seconds, not minutes
+    screener.RETRY_POLICY = RetryPolicy(max_attempts=6, base_delay=0.05, max_delay=1.0)
+    files = corpus.generate(args.resumes, args.min_pages, args.max_pages)
+    server = MockGeminiServer(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, defect_rate=args.defect_rate
+    ).start()
+    try:
+        screener.configure("test", transport="rest", api_endpoint=server.url)
+        job_description = "Senior Python backend engineer with SQL and Docker"
+        words = job_description.split()
+        job_description = " ".join(words[i % len(words)] for i in range(max(args.jd_words, len(words))))
+        elapsed, latencies, scored, failed, stages = run(files, job_description, args)
+    finally:
+        server.stop()
+        screener.shutdown_extraction_pool() # Workers only show up in RUSAGE_CHILDREN once reaped
+
+    rss_main, rss_worker = peak_rss_mb()
+    report = {
+        "resumes": args.resumes,
+        "scored": scored,
+        "failed": failed,
+        "seconds": round(elapsed, 2),
+        "resumes_per_sec": round(args.resumes / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000),
+        "p95_ms": round(percentile(latencies, 95) * 1000),
+        "p99_ms": round(percentile(latencies, 99) * 1000),
+        "mean_ms": round(statistics.mean(latencies) * 1000),
+        "api_requests": server.requests,
+        "throttled": server.throttled,
+        "prompt_tokens_sent": server.prompt_tokens,
+        "prompt_tokens_cached": server.cached_tokens,
+        **{f"replies_{name}": count for name, count in RESPONSE_STATS.stats().items()},
+        "peak_rss_mb": round(rss_main, 1),
+        "peak_worker_rss_mb": round(rss_worker, 1),
+    }
+    if args.json:
+        print(json.dumps({**report, "stages": stages}))
+    else:
+        for key, value in report.items():
+            print(f"{key:>20}: {value}")
+        print(pd.DataFrame(stages).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
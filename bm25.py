@@ -0,0 +1,87 @@
+import re
+from collections import Counter
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*") # Keeps c++, c#, node.js
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or our the this to we will with you your".split()
+)
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over a term-major sparse matrix (CSC-style postings held in NumPy arrays).
+
+    Scoring a query gathers the postings of its terms with one vectorized index
+    computation and sums them per document with np.bincount, so cost grows with
+    the number of matching postings rather than with the size of the vocabulary.
+    """
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}
+        doc_ids, term_ids, counts = [], [], []
+        lengths = []
+        for doc_id, text in enumerate(documents):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                doc_ids.append(doc_id)
+                term_ids.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                counts.append(count)
+
+        self.n_docs = len(lengths)
+        self.doc_len = np.asarray(lengths, dtype=np.float64)
+        avgdl = self.doc_len.mean() if self.n_docs and self.doc_len.mean() > 0 else 1.0
+        self.norm = k1 * (1 - b + b * self.doc_len / avgdl) # Per-document part of the BM25 denominator
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(term_ids, kind="stable")
+        self.postings_doc = np.asarray(doc_ids, dtype=np.int64)[order]
+        self.postings_tf = np.asarray(counts, dtype=np.float64)[order]
+        df = np.bincount(term_ids, minlength=len(self.vocabulary))
+        self.term_ptr = np.concatenate(([0], np.cumsum(df)))
+        self.idf = np.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def score(self, query):
+        """BM25 score of every document against `query`, as an array of length n_docs."""
+        terms = np.fromiter(
+            {self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary}, dtype=np.int64
+        )
+        if not self.n_docs or not len(terms):
+            return np.zeros(self.n_docs)
+        starts = self.term_ptr[terms]
+        lengths = self.term_ptr[terms + 1] - starts
+        # Flat indices of every posting of every query term, without a Python loop
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        index = np.arange(lengths.sum()) + offsets
+        docs = self.postings_doc[index]
+        tf = self.postings_tf[index]
+        weights = np.repeat(self.idf[terms], lengths) * tf * (self.k1 + 1) / (tf + self.norm[docs])
+        return np.bincount(docs, weights=weights, minlength=self.n_docs)
+
+
+def local_scores(texts, query):
+    """BM25 scores rescaled to 0-100, where 100 is the best document in this batch."""
+    scores = BM25Index(texts).score(query)
+    best = scores.max() if len(scores) else 0
+    return scores * (100 / best) if best > 0 else scores
+
+
+def select(scores, top_k=0, min_score=0):
+    """Boolean mask of documents that pass the cut-off (top_k=0 / min_score=0 disable that test)."""
+    keep = scores >= min_score
+    if top_k and top_k < len(scores):
+        keep &= _top_k_mask(scores, top_k)
+    return keep
+
+
+def _top_k_mask(scores, k):
+    mask = np.zeros(len(scores), dtype=bool)
+    mask[np.argpartition(-scores, k - 1)[:k]] = True
+    return mask
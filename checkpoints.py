@@ -0,0 +1,150 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(".cache", "jobs.sqlite3")
+DEFAULT_TTL = 30 * 24 * 3600 # Seconds a job (and its uploaded PDFs) is kept
+FLUSH_ROWS = 25 # Buffered file updates that force a write
+FLUSH_SECONDS = 1.0 # Longest a buffered update waits for its write
+UNREADABLE = "unreadable" # error of files that never reached Gemini; everything else can be retried
+
+
+class JobStore:
+    """Screening jobs and the per-file progress of each, checkpointed to SQLite.
+
+    A file moves pending -> extracted -> scored, or to failed. Uploads are stored with
+    the job so an interrupted one can be resumed after a restart without re-uploading;
+    they have a table of their own, so reading a job's progress never pages through them.
+    Status updates are buffered and written in one transaction per flush, so a crash
+    loses at most the last FLUSH_SECONDS of progress, which the response cache makes
+    cheap to redo.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL") # WAL keeps this crash-safe; only power loss can drop a flush
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, job_description TEXT, options TEXT, "
+            "status TEXT NOT NULL, created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "job_id TEXT NOT NULL, position INTEGER NOT NULL, filename TEXT NOT NULL, "
+            "status TEXT NOT NULL, text_hash TEXT, result TEXT, error TEXT, file_hash TEXT, "
+            "PRIMARY KEY (job_id, position))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            "job_id TEXT NOT NULL, position INTEGER NOT NULL, data BLOB NOT NULL, PRIMARY KEY (job_id, position))"
+        )
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(files)")]
+        if "file_hash" not in columns: # Stores created before file hashes were kept
+            self.conn.execute("ALTER TABLE files ADD COLUMN file_hash TEXT")
+        if "data" in columns: # Stores created before uploads had their own table
+            self.conn.execute("INSERT OR IGNORE INTO uploads SELECT job_id, position, data FROM files")
+            self.conn.execute("ALTER TABLE files DROP COLUMN data")
+        self.conn.commit()
+
+    def start(self, job, files, options):
+        """Records a new job with all its files pending; a job that already exists is left as it is."""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("DELETE FROM files WHERE job_id IN (SELECT id FROM jobs WHERE updated <= ?)", (now - self.ttl,))
+            self.conn.execute("DELETE FROM uploads WHERE job_id IN (SELECT id FROM jobs WHERE updated <= ?)", (now - self.ttl,))
+            self.conn.execute("DELETE FROM jobs WHERE updated <= ?", (now - self.ttl,))
+            exists = self.conn.execute("SELECT 1 FROM jobs WHERE id = ?", (job.id,)).fetchone()
+            if not exists:
+                self.conn.execute(
+                    "INSERT INTO jobs VALUES (?, ?, ?, ?, 'running', ?, ?)",
+                    (job.id, job.kind, job.job_description, json.dumps(options), now, now),
+                )
+                self.conn.executemany(
+                    "INSERT INTO files (job_id, position, filename, status, file_hash) VALUES (?, ?, ?, 'pending', ?)",
+                    [(job.id, i, name, job.hashes.get(name)) for i, (name, _) in enumerate(files)],
+                )
+                self.conn.executemany(
+                    "INSERT INTO uploads VALUES (?, ?, ?)", [(job.id, i, data) for i, (_, data) in enumerate(files)]
+                )
+            self.conn.commit()
+
+    def checkpoint(self, job_id, filename, status, text_hash=None, result=None, error=None):
+        """Buffers a file's new status; safe to call from any thread, written by the next flush()."""
+        with self.lock:
+            self.pending.append((
+                status, text_hash, None if result is None else json.dumps(result), error, job_id, filename
+            ))
+
+    def flush(self, force=False):
+        """Writes buffered updates in one transaction once FLUSH_ROWS or FLUSH_SECONDS is reached."""
+        with self.lock:
+            due = len(self.pending) >= FLUSH_ROWS or time.monotonic() - self.last_flush >= FLUSH_SECONDS
+            if not self.pending or not (force or due):
+                return
+            self.conn.executemany(
+                "UPDATE files SET status = ?, text_hash = COALESCE(?, text_hash), result = COALESCE(?, result), "
+                "error = ? WHERE job_id = ? AND filename = ?",
+                self.pending,
+            )
+            self.conn.commit()
+            self.pending = []
+            self.last_flush = time.monotonic()
+
+    def finish(self, job_id, status="done"):
+        self.flush(force=True)
+        with self.lock:
+            self.conn.execute("UPDATE jobs SET status = ?, updated = ? WHERE id = ?", (status, time.time(), job_id))
+            self.conn.commit()
+
+    def retry_failed(self, job_id):
+        """Puts the job's Gemini failures back in line (they were extracted, so the pre-ranking stands)."""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE files SET status = 'extracted', error = NULL "
+                "WHERE job_id = ? AND status = 'failed' AND error IS NOT ?",
+                (job_id, UNREADABLE),
+            )
+            self.conn.execute("UPDATE jobs SET status = 'running', updated = ? WHERE id = ?", (time.time(), job_id))
+            self.conn.commit()
+
+    def job(self, job_id):
+        """(kind, job_description, options, status) of a stored job, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT kind, job_description, options, status FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return (row[0], row[1], json.loads(row[2]), row[3]) if row else None
+
+    def files(self, job_id, with_data=True):
+        """[{filename, data, status, result, error, file_hash}] in upload order; data is None without `with_data`."""
+        data, uploads = ("uploads.data", "JOIN uploads USING (job_id, position)") if with_data else ("NULL", "")
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT filename, {data}, status, result, error, file_hash FROM files {uploads} "
+                "WHERE job_id = ? ORDER BY position",
+                (job_id,),
+            ).fetchall()
+        return [
+            {"filename": row[0], "data": row[1], "status": row[2],
+             "result": json.loads(row[3]) if row[3] else None, "error": row[4], "file_hash": row[5]}
+            for row in rows
+        ]
+
+    def interrupted(self, limit=10):
+        """[(job_id, created, files, finished_files)] of the most recent jobs that never finished."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT jobs.id, jobs.created, COUNT(*), SUM(files.status IN ('scored', 'failed')) "
+                "FROM jobs JOIN files ON files.job_id = jobs.id WHERE jobs.status = 'running' "
+                "GROUP BY jobs.id ORDER BY jobs.created DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
@@ -0,0 +1,176 @@
+"""Headless batch screening: python cli.py RESUMES... --jd JD.txt --output results.jsonl
+
+RESUMES may be directories (searched recursively for PDFs), glob patterns or files.
+Each candidate is appended to the output as one JSON line as soon as it is done;
+re-running with the same output skips every file already recorded there, except
+ones that failed and are worth another try. A resume that nearly matches one
+screened earlier in the run is recorded as a duplicate of it instead of being scored.
+Scored records carry an email_draft rendered locally from an email template.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+
+import screener
+from dedup import NearDuplicateIndex
+from email_templates import TemplateStore, render, role_title
+from prompt_budget import RESUME_TOKENS
+from pipeline import Pipeline
+from rate_limiter import RateLimiter
+from response_cache import DEFAULT_PATH as RESPONSE_CACHE_PATH, ResponseCache
+from retry import CircuitBreaker
+from text_cache import DEFAULT_DIR as TEXT_CACHE_DIR, TextCache
+
+
+def find_pdfs(inputs):
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                paths.extend(os.path.join(root, name) for name in names if name.lower().endswith(".pdf"))
+        elif os.path.isfile(item):
+            paths.append(item)
+        else:
+            paths.extend(glob.glob(item, recursive=True))
+    return sorted(set(paths))
+
+
+def load_done(output):
+    """Filenames already in the output that should not be screened again."""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue # A line cut short by an interrupted run
+            if record.get("status") != "failed":
+                done.add(record["filename"])
+    return done
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def read_files(paths):
+    """Yields (path, bytes) lazily, so only the files the pipeline is working on sit in memory."""
+    for path in paths:
+        with open(path, "rb") as f:
+            yield path, f.read()
+
+
+async def screen_paths(paths, job_description, out, args, template):
+    limiter = RateLimiter.for_model(screener.MODEL_NAME, args.rpm, args.tpm)
+    breaker = CircuitBreaker()
+    text_cache = None if args.no_cache else TextCache(TEXT_CACHE_DIR, version=screener.EXTRACTOR_VERSION)
+    response_cache = None if args.no_cache else ResponseCache(RESPONSE_CACHE_PATH)
+    dedup = None if args.keep_duplicates else NearDuplicateIndex()
+    pipeline = Pipeline(
+        job_description, limiter, args.concurrency, args.timeout, text_cache, response_cache, breaker,
+        dedup=dedup, context_cache=not args.no_context_cache, batch_tokens=args.batch_tokens,
+    )
+    counts = {"scored": 0, "duplicate": 0, "unreadable": 0, "failed": 0}
+
+    def sink(path, event, value):
+        if event == "extracted":
+            return
+        record = {"filename": path}
+        if event == "scored":
+            record.update(value, status="scored", email_draft=render(template, value, args.role or role_title(job_description)))
+        elif event == "duplicate":
+            record.update(status="duplicate", duplicate_of=value)
+        elif event == "failed":
+            record.update(status="failed", error=value.kind)
+        else:
+            record["status"] = "unreadable"
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+        counts[record["status"]] += 1
+        print(f"[{sum(counts.values())}/{len(paths)}] {record['status']}: {path}", file=sys.stderr)
+
+    await pipeline.run(read_files(paths), sink)
+    if response_cache:
+        response_cache.flush()
+    for stage in pipeline.stats():
+        print(
+            f"{stage['stage']:>8}: {stage['done']} items, {stage['per_sec']}/s, "
+            f"{stage['busy']:.0%} busy across {stage['workers']} workers",
+            file=sys.stderr,
+        )
+    if pipeline.jd_cuts:
+        print(f"job description trimmed to fit the prompt: {'; '.join(pipeline.jd_cuts)}", file=sys.stderr)
+    context = pipeline.context_stats()
+    if context:
+        print(f"context cache: {context[0]} calls, {context[1]} cached prompt tokens, {context[2]} not re-sent", file=sys.stderr)
+    batches = pipeline.batch_stats()
+    if batches:
+        print(f"batching: {batches[1]} resumes in {batches[0]} shared requests, {batches[2]} scored alone", file=sys.stderr)
+    checked = pipeline.counters.stats()
+    print(
+        f"responses: {checked['replies_checked']} checked, {checked['replies_repaired']} repaired locally, "
+        f"{checked['replies_reasked']} re-asked, {checked['replies_unusable']} unusable",
+        file=sys.stderr,
+    )
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("--jd", required=True, help="Text file with the job description")
+    parser.add_argument("--output", "-o", default="results.jsonl")
+    parser.add_argument("--api-key", default=os.getenv("GEMINI_API_KEY"))
+    parser.add_argument("--concurrency", type=int, default=screener.MAX_IN_FLIGHT)
+    parser.add_argument("--timeout", type=float, default=screener.EXTRACT_TIMEOUT, help="Seconds per PDF extraction")
+    parser.add_argument("--rpm", type=int, help="Requests per minute (default: the model's published quota)")
+    parser.add_argument("--tpm", type=int, help="Tokens per minute (default: the model's published quota)")
+    parser.add_argument("--no-cache", action="store_true", help="Skip the on-disk text and response caches")
+    parser.add_argument("--keep-duplicates", action="store_true", help="Score near-identical resumes separately")
+    parser.add_argument("--no-context-cache", action="store_true", help="Send the job description with every prompt")
+    parser.add_argument("--batch-tokens", type=int, default=0, help="Pack resumes into one request up to this many tokens")
+    parser.add_argument("--email-template", default="Interview invite", help="Saved email template to render")
+    parser.add_argument("--role", help="Role title for emails (default: the JD's first line)")
+    parser.add_argument("--estimate", action="store_true", help="Print the token and cost estimate, then exit")
+    parser.add_argument("--transport", help="SDK transport, e.g. rest")
+    parser.add_argument("--api-endpoint", help="Override the Gemini endpoint (e.g. a local stand-in)")
+    args = parser.parse_args(argv)
+
+    with open(args.jd, encoding="utf-8") as f:
+        job_description = f.read()
+    if args.estimate:
+        paths = find_pdfs(args.inputs)
+        pages = [screener.page_count(data) for _, data in read_files(paths)]
+        input_tokens, output_tokens, cost = screener.estimate_run(
+            [min(RESUME_TOKENS, n * screener.TOKENS_PER_PAGE) for n in pages], job_description
+        )
+        print(f"{len(paths)} resumes: up to {input_tokens:,} prompt + {output_tokens:,} output tokens, about ${cost:.4f}")
+        return 0
+    if not args.api_key:
+        parser.error("set GEMINI_API_KEY or pass --api-key")
+    templates = TemplateStore().all()
+    if args.email_template not in templates:
+        parser.error(f"no email template named {args.email_template!r}; saved ones: {', '.join(templates)}")
+
+    screener.configure(args.api_key, args.transport, args.api_endpoint)
+    done = load_done(args.output)
+    paths = [path for path in find_pdfs(args.inputs) if path not in done]
+    print(f"{len(paths)} to screen, {len(done)} already in {args.output}", file=sys.stderr)
+
+    with open(args.output, "a", encoding="utf-8") as out:
+        if out.tell() and not _ends_with_newline(args.output):
+            out.write("\n") # Don't glue the first new record onto a line cut short by an interruption
+        counts = asyncio.run(screen_paths(paths, job_description, out, args, templates[args.email_template]))
+    print(", ".join(f"{n} {status}" for status, n in counts.items()), file=sys.stderr)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import threading
+
+import google.generativeai as genai
+from google.generativeai import caching
+
+from rate_limiter import estimate_tokens
+from screener import BATCH_CONFIG, GENERATION_CONFIG, INSTRUCTIONS, MODEL_NAME
+
+CACHE_MODEL_NAME = f"models/{MODEL_NAME}-002" # Cached content needs a pinned model version
+MIN_CACHE_TOKENS = 32_768 # Smallest cache the API accepts for this model
+CACHE_TTL = 2 * 3600 # Seconds; the cache is deleted as soon as the batch ends anyway
+
+
+def job_description_block(job_description):
+    return f"JOB DESC: {job_description}"
+
+
+def resume_prompt(resume_text):
+    return f"RESUME: {resume_text}"
+
+
+class JobContext:
+    """The instructions and one JD registered as cached content for the length of a batch.
+
+    Requests made through `model` only carry resume_prompt(); Gemini reads the rest
+    from the cache, billed at the cached-token rate instead of being re-sent every time.
+    """
+
+    def __init__(self, cached, prefix_tokens):
+        self.cached = cached
+        self.model = genai.GenerativeModel.from_cached_content(cached, generation_config=GENERATION_CONFIG)
+        self.batch_model = genai.GenerativeModel.from_cached_content(cached, generation_config=BATCH_CONFIG)
+        self.prefix_tokens = prefix_tokens
+        self.calls = 0
+        self.cached_tokens = 0
+        self.lock = threading.Lock()
+
+    def record(self, response):
+        usage = getattr(response, "usage_metadata", None)
+        with self.lock:
+            self.calls += 1
+            self.cached_tokens += getattr(usage, "cached_content_token_count", 0) or 0
+
+    def tokens_saved(self):
+        """Prompt tokens not sent again: every call after the one that paid for the cache."""
+        return max(0, self.cached_tokens - self.prefix_tokens)
+
+    def delete(self):
+        try:
+            self.cached.delete()
+        except Exception:
+            pass # It expires after CACHE_TTL regardless
+
+
+def cache_job_description(job_description, min_tokens=MIN_CACHE_TOKENS, ttl=CACHE_TTL):
+    """A JobContext for `job_description`, or None when the prefix is too small to cache or caching fails.
+
+    Callers fall back to inline prompts (screener.build_prompt) on None.
+    """
+    prefix_tokens = estimate_tokens(INSTRUCTIONS + job_description_block(job_description))
+    if prefix_tokens < min_tokens:
+        return None
+    try:
+        cached = caching.CachedContent.create(
+            model=CACHE_MODEL_NAME,
+            display_name="resume-screener-jd",
+            system_instruction=INSTRUCTIONS,
+            contents=[job_description_block(job_description)],
+            ttl=ttl,
+        )
+        return JobContext(cached, cached.usage_metadata.total_token_count or prefix_tokens)
+    except Exception:
+        return None
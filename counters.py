@@ -0,0 +1,50 @@
+"""Per-job tallies that the caches and reply checks add to, next to their process-wide totals.
+
+Several jobs share one process, its caches and its event loop, so before/after
+differences of the global counts mix their traffic. A job makes its Counters
+current with counting(); code running for it (asyncio tasks it creates and
+asyncio.to_thread calls included) adds to them without being handed anything.
+"""
+import collections
+import contextlib
+import contextvars
+import threading
+
+_current = contextvars.ContextVar("counters", default=None)
+
+
+class Counters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = collections.Counter()
+
+    def add(self, name, n=1):
+        with self.lock:
+            self.counts[name] += n
+
+    def stats(self):
+        """A Counter copy; names never counted read as 0."""
+        with self.lock:
+            return collections.Counter(self.counts)
+
+
+def count(name, n=1):
+    """Adds to the current job's Counters, if there is one."""
+    counters = _current.get()
+    if counters is not None:
+        counters.add(name, n)
+
+
+@contextlib.contextmanager
+def counting(counters):
+    token = _current.set(counters)
+    try:
+        yield counters
+    finally:
+        _current.reset(token)
+
+
+async def counted(counters, coro):
+    """Awaits `coro` with `counters` current, for coroutines scheduled on another thread's loop."""
+    with counting(counters):
+        return await coro
@@ -0,0 +1,90 @@
+import zlib
+
+import numpy as np
+
+from bm25 import tokenize
+
+NUM_PERM = 128 # MinHash signature length
+BANDS = 16 # LSH bands of NUM_PERM // BANDS rows; pairs above ~0.7 Jaccard share a band with high odds
+SHINGLE = 5 # Words per shingle
+THRESHOLD = 0.8 # Estimated Jaccard similarity from which two resumes count as the same CV
+_MIX = np.uint64(0x9E3779B97F4A7C15) # Odd multiplier that spreads word hashes across 64 bits
+
+
+def shingles(text, size=SHINGLE):
+    """Distinct 64-bit hashes of every run of `size` consecutive words (the whole text when it is shorter)."""
+    words = np.array([zlib.crc32(word.encode("utf-8")) for word in tokenize(text)], dtype=np.uint64)
+    if len(words) < size:
+        size = max(1, len(words))
+        words = words if len(words) else np.zeros(1, dtype=np.uint64)
+    # Polynomial rolling hash over word hashes; uint64 arithmetic wraps, which is what we want
+    hashes = np.zeros(len(words) - size + 1, dtype=np.uint64)
+    for offset in range(size):
+        hashes = hashes * _MIX + words[offset:len(hashes) + offset]
+    return np.unique(hashes)
+
+
+class MinHasher:
+    """MinHash signatures from NUM_PERM multiply-shift hash functions applied to all shingles at once."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(0, np.iinfo(np.uint64).max, size=(num_perm, 1), dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, np.iinfo(np.uint64).max, size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, text):
+        hashes = shingles(text)[None, :]
+        return ((self.a * hashes + self.b) >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """Streaming near-duplicate detection with MinHash and LSH banding.
+
+    Each text is only compared with earlier texts that share at least one band,
+    so adding n texts costs O(n) hashing plus a handful of signature comparisons
+    per text instead of n^2 / 2 pairwise checks.
+    """
+
+    def __init__(self, threshold=THRESHOLD, num_perm=NUM_PERM, bands=BANDS):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self.rows = num_perm // bands
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = {}
+
+    def add(self, key, text):
+        """Indexes `text` under `key`; returns the key of an earlier near-duplicate instead, if there is one."""
+        return self.add_signature(key, self.hasher.signature(text))
+
+    def add_signature(self, key, signature):
+        """Like add(), for a signature computed elsewhere (e.g. off the event loop)."""
+        bands = [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(len(self.buckets))]
+        candidates = set()
+        for buckets, band in zip(self.buckets, bands):
+            candidates.update(buckets.get(band, ()))
+        best, best_similarity = None, self.threshold
+        for candidate in candidates:
+            similarity = float(np.mean(self.signatures[candidate] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        if best is not None:
+            return best
+        self.signatures[key] = signature
+        for buckets, band in zip(self.buckets, bands):
+            buckets.setdefault(band, []).append(key)
+        return None
+
+
+def exact_duplicates(files, hashes):
+    """Splits [(name, bytes)] into the first copy of every distinct file and {name: first copy's name}."""
+    first = {}
+    unique, copies = [], {}
+    for name, data in files:
+        digest = hashes[name]
+        if digest in first:
+            if first[digest] != name: # The same file listed twice is not a copy of itself
+                copies[name] = first[digest]
+        else:
+            first[digest] = name
+            unique.append((name, data))
+    return unique, copies
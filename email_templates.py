@@ -0,0 +1,105 @@
+import json
+import os
+import re
+import threading
+
+DEFAULT_PATH = os.path.join(".cache", "email_templates.json")
+DEFAULT_SENDER = "The Recruiting Team"
+PLACEHOLDER = re.compile(r"\{(\w+)\}")
+DEFAULT_TEMPLATES = {
+    "Interview invite": (
+        "Hi {first_name},\n\n"
+        "Thank you for applying for the {role} position. Your experience with {top_skills} stood out to us, "
+        "and we would love to invite you to an interview.\n\n"
+        "Could you reply with a few times that work for you over the next week?\n\n"
+        "Best regards,\n{sender}"
+    ),
+    "Phone screen": (
+        "Hi {first_name},\n\n"
+        "Thanks for your interest in the {role} role. We'd like to set up a 20-minute call to hear more about "
+        "your work with {skill} and tell you about the team.\n\n"
+        "Which days suit you best?\n\n"
+        "Best,\n{sender}"
+    ),
+}
+
+
+def role_title(job_description):
+    """First line of the JD, which is the title in most postings; "open" when it reads like prose."""
+    for line in job_description.splitlines():
+        line = line.strip().strip("#*").strip()
+        if line:
+            return line if len(line) <= 80 else "open"
+    return "open"
+
+
+def _words(items):
+    items = [str(item) for item in items if str(item).strip()]
+    if len(items) < 2:
+        return "".join(items)
+    return ", ".join(items[:-1]) + " and " + items[-1]
+
+
+def fields(candidate, role="open", sender=DEFAULT_SENDER):
+    """Placeholder values from an analysis row."""
+    name = str(candidate.get('candidate_name') or "").strip()
+    if name.lower() in ("", "unknown"):
+        name = "there" # "Hi there,"
+    skills = list(candidate.get('key_skills') or [])
+    return {
+        "candidate_name": name,
+        "first_name": name.split()[0],
+        "role": role,
+        "top_skills": _words(skills[:3]) or "your background",
+        "skill": skills[0] if skills else "your background",
+        "years_experience": candidate.get('years_experience', ""),
+        "match_score": candidate.get('match_score', ""),
+        "sender": sender,
+    }
+
+
+def render(template, candidate, role="open", sender=DEFAULT_SENDER):
+    """Fills {placeholders} in `template`; unknown ones are left as typed, so a typo shows in the draft."""
+    values = fields(candidate, role, sender)
+    return PLACEHOLDER.sub(lambda match: str(values.get(match.group(1), match.group(0))), template)
+
+
+class TemplateStore:
+    """Recruiter-edited email templates in a JSON file, layered over DEFAULT_TEMPLATES."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+
+    def _saved(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def all(self):
+        """{name: text}, defaults first, with saved edits in place of the defaults they override."""
+        with self.lock:
+            return {**DEFAULT_TEMPLATES, **self._saved()}
+
+    def save(self, name, text):
+        with self.lock:
+            saved = self._saved()
+            saved[name] = text
+            self._write(saved)
+
+    def delete(self, name):
+        """Drops a saved template; a default one goes back to its original text."""
+        with self.lock:
+            saved = self._saved()
+            if saved.pop(name, None) is not None:
+                self._write(saved)
+
+    def _write(self, saved):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(saved, f, indent=2)
+        os.replace(tmp, self.path) # Never leave a half-written file behind
@@ -0,0 +1,106 @@
+import hashlib
+import itertools
+import time
+
+import google.generativeai as genai
+import numpy as np
+
+from bm25 import tokenize
+from rate_limiter import RateLimiter, estimate_tokens
+from retry import CircuitBreaker, RetryPolicy, ScoringFailed, classify_error
+
+EMBEDDING_MODEL = "models/text-embedding-004"
+EMBED_BATCH_SIZE = 100 # Most texts batchEmbedContents accepts per request
+MAX_EMBED_CHARS = 8_000 # ~2k tokens, the model's input limit
+
+
+def normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class GeminiEmbedder:
+    """Batched calls to the Gemini embedding API; rows come back L2-normalized.
+
+    Calls wait on their own rate limiter and circuit breaker (the embedding quota is
+    separate from the scoring one) and transient errors are retried with backoff;
+    raises ScoringFailed once retries run out.
+    """
+
+    def __init__(self, model=EMBEDDING_MODEL, batch_size=EMBED_BATCH_SIZE, limiter=None, breaker=None, policy=None):
+        self.model = model
+        self.batch_size = batch_size
+        self.name = model
+        self.limiter = limiter or RateLimiter.for_model(model.split("/")[-1])
+        self.breaker = breaker or CircuitBreaker()
+        self.policy = policy or RetryPolicy()
+
+    def embed(self, texts, task_type="retrieval_document"):
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = [text[:MAX_EMBED_CHARS] for text in texts[start:start + self.batch_size]]
+            vectors.extend(self._embed_batch(batch, task_type))
+        return normalize(np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1))
+
+    def _embed_batch(self, batch, task_type):
+        estimated = sum(estimate_tokens(text) for text in batch)
+        for attempt in itertools.count():
+            self.breaker.wait()
+            self.limiter.acquire(estimated)
+            try:
+                vectors = genai.embed_content(model=self.model, content=batch, task_type=task_type)["embedding"]
+                break
+            except Exception as exc:
+                kind = classify_error(exc)
+                self.breaker.record(False)
+                if not self.policy.should_retry(kind, attempt):
+                    raise ScoringFailed(kind, exc) from exc
+                time.sleep(self.policy.delay(attempt, kind))
+        self.breaker.record(True)
+        return vectors
+
+
+class HashingEmbedder:
+    """Deterministic local stand-in: feature-hashed bag of words, for tests and offline runs."""
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts, task_type="retrieval_document"):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                matrix[row, bucket] += 1 if digest[4] & 1 else -1
+        return normalize(matrix)
+
+
+def similarity_matrix(texts, queries, embedder, documents=None):
+    """N x M cosine similarities (0-100) of every text to every query, from one matrix product.
+
+    `documents` are the texts' retrieval_document vectors, when the caller already has them.
+    """
+    if not texts or not queries:
+        return np.zeros((len(texts), len(queries)))
+    if documents is None:
+        documents = embedder.embed(texts, "retrieval_document")
+    query_vectors = embedder.embed(queries, "retrieval_query")
+    return np.clip(documents @ query_vectors.T, 0, 1) * 100
+
+
+def top_k_per_column(matrix, k):
+    """Boolean mask with the k highest entries of every column set."""
+    mask = np.zeros(matrix.shape, dtype=bool)
+    if k >= matrix.shape[0]:
+        mask[:] = True
+    elif k > 0:
+        rows = np.argpartition(-matrix, k - 1, axis=0)[:k]
+        mask[rows, np.arange(matrix.shape[1])] = True
+    return mask
+
+
+def semantic_scores(texts, query, embedder, documents=None):
+    """Cosine similarity of each text to `query` as 0-100, from one matrix-vector product."""
+    return similarity_matrix(texts, [query], embedder, documents)[:, 0]
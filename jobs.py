@@ -0,0 +1,602 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from bm25 import local_scores, select
+from checkpoints import UNREADABLE
+from counters import Counters
+from dedup import NearDuplicateIndex, exact_duplicates
+from email_templates import render
+from embeddings import semantic_scores, similarity_matrix, top_k_per_column
+from response_cache import normalized_hash
+from retry import ScoringFailed
+from pipeline import Pipeline
+from screener import EXTRACT_TIMEOUT, MAX_IN_FLIGHT, analyze_pairs, extract_batch, get_event_loop, polish_email_async
+
+MAX_JOBS = 4 # Screening jobs that run at once; later submissions wait in the queue
+KEEP_FINISHED = 3600 # Seconds a finished job stays retrievable by its ID
+
+
+class Services:
+    """The process-wide objects a job needs, gathered by the app so workers never touch Streamlit."""
+
+    def __init__(self, limiter, breaker, text_cache, responses, embedder=None, pool=None,
+                 max_in_flight=MAX_IN_FLIGHT, timeout=EXTRACT_TIMEOUT, store=None, batch_tokens=0):
+        self.limiter = limiter
+        self.breaker = breaker
+        self.text_cache = text_cache
+        self.responses = responses
+        self.embedder = embedder
+        self.pool = pool
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.store = store # checkpoints.JobStore; single-JD jobs are checkpointed when set
+        self.batch_tokens = batch_tokens # Pack resumes into shared requests up to this many tokens; 0 is off
+
+
+class Job:
+    """State of one screening job; workers write it, any session can read it by ID."""
+
+    def __init__(self, kind, total, job_description=""):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.job_description = job_description
+        self.status = "queued" # queued -> running -> done | failed; "interrupted" when restored unfinished
+        self.total = total
+        self.done = 0
+        self.message = "Waiting for a free worker..."
+        self.results = []
+        self.retry_queue = []
+        self.role_results = None
+        self.notes = [] # One-line summaries (cache hits, talent pool) shown once the job is done
+        self.pipeline = None # Set while files go through the staged pipeline, for its per-stage stats
+        self.hashes = {} # filename -> sha256 of its bytes, to tell new and changed uploads apart next time
+        self.copies = {} # filename -> the (near-)identical file that was scored in its place
+        self.counters = Counters() # This job's cache hits and reply repairs; the caches' own stats are process-wide
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.lock = threading.Lock()
+
+    def update(self, **fields):
+        with self.lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+    def step(self, message):
+        with self.lock:
+            self.done += 1
+            self.message = message
+
+    @property
+    def progress(self):
+        return min(1.0, self.done / self.total) if self.total else 1.0
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+
+class JobRunner:
+    """Runs screening jobs on a thread pool, so they outlive the script run that submitted them."""
+
+    def __init__(self, max_workers=MAX_JOBS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="screening-job")
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, job, fn, *args, **kwargs):
+        """Queues fn(job, *args, **kwargs) and returns the job's ID."""
+        with self.lock:
+            self._forget_old()
+            self.jobs[job.id] = job
+        self.executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def keep(self, job):
+        """Holds a job restored from its checkpoints like a submitted one, so it is only restored once; returns it."""
+        if job:
+            with self.lock:
+                self._forget_old()
+                self.jobs.setdefault(job.id, job)
+                job = self.jobs[job.id]
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.update(status="running", message="Starting...")
+        try:
+            fn(job, *args, **kwargs)
+            job.update(status="done")
+        except Exception as exc:
+            job.update(status="failed", error=f"{type(exc).__name__}: {exc}", message="Job failed.")
+        finally:
+            job.update(finished=time.time())
+
+    def _forget_old(self):
+        now = time.time()
+        for job_id, job in list(self.jobs.items()):
+            if job.finished and now - job.finished > KEEP_FINISHED:
+                del self.jobs[job_id]
+
+
+def restore_job(store, job_id):
+    """Rebuilds a checkpointed job that is no longer in memory (e.g. after a restart), or None.
+
+    Uploads stay in the store; resume_files() reads them when the job runs again.
+    """
+    saved = store.job(job_id)
+    if not saved:
+        return None
+    kind, job_description, _, status = saved
+    rows = store.files(job_id, with_data=False)
+    job = Job(kind, len(rows), job_description)
+    job.id = job_id
+    job.results = [row["result"] for row in rows if row["status"] == "scored" and 'duplicate_of' not in row["result"]]
+    job.copies = {
+        row["filename"]: row["result"]['duplicate_of']
+        for row in rows if row["status"] == "scored" and 'duplicate_of' in row["result"]
+    }
+    _attach_duplicates(job)
+    job.retry_queue = [row["filename"] for row in rows if row["status"] == "failed" and row["error"] != UNREADABLE]
+    job.hashes = {row["filename"]: row["file_hash"] for row in rows if row["file_hash"]}
+    job.done = sum(row["status"] in ("scored", "failed") for row in rows)
+    if status == "done":
+        job.status, job.message = "done", "Analysis Complete!"
+    else:
+        job.status, job.message = "interrupted", f"Interrupted after {job.done} of {job.total} files."
+    job.finished = time.time()
+    return job
+
+
+# --- JOBS ---
+def _checkpoint(job, services, filename, status, text_hash=None, result=None, error=None):
+    if services.store:
+        services.store.checkpoint(job.id, filename, status, text_hash, result, error)
+
+
+def _duplicate(job, services, name, original):
+    job.copies[name] = original
+    _checkpoint(job, services, name, "scored", result={'duplicate_of': original})
+
+
+def _attach_duplicates(job, rows=None):
+    """Lists every copy on the row of the file that was scored in its place (rows default to job.results)."""
+    groups = {}
+    for name, original in job.copies.items():
+        seen = {name}
+        while original in job.copies and original not in seen: # A byte-identical copy of a near-duplicate
+            seen.add(original)
+            original = job.copies[original]
+        if original != name:
+            groups.setdefault(original, []).append(name)
+    for row in job.results if rows is None else rows:
+        if row['filename'] in groups:
+            row['duplicate_files'] = sorted(groups[row['filename']])
+
+
+def unique_names(files):
+    """[(name, bytes)] with repeated names numbered by position, e.g. a second resume.pdf becomes resume (2).pdf.
+
+    Jobs key results, hashes, copies and checkpoints by filename, so two different
+    uploads must never share one.
+    """
+    taken = {name for name, _ in files}
+    seen = set()
+    renamed = []
+    for i, (name, data) in enumerate(files):
+        if name in seen:
+            stem, ext = os.path.splitext(name)
+            number = i + 1
+            while f"{stem} ({number}){ext}" in taken:
+                number += 1
+            name = f"{stem} ({number}){ext}"
+            taken.add(name)
+        seen.add(name)
+        renamed.append((name, data))
+    return renamed
+
+
+def _extract_all(job, files, services):
+    job.update(message=f"Reading {len(files)} files...")
+    futures = extract_batch(files, services.timeout, services.text_cache, job.counters)
+    extractions = []
+    for future in as_completed(futures):
+        try:
+            extraction = future.result()
+        except ScoringFailed as exc: # Timed out, so unlike an unreadable file it can be retried
+            job.retry_queue.append(futures[future])
+            _checkpoint(job, services, futures[future], "failed", error=exc.kind)
+            continue
+        if extraction and extraction["text"]:
+            extractions.append((futures[future], extraction))
+        else:
+            _checkpoint(job, services, futures[future], "failed", error=UNREADABLE)
+    return extractions
+
+
+def _extract_unique(job, files, services):
+    """Extracts [(name, bytes)] and returns [(name, extraction)] of the readable files that are no near-duplicate of an earlier one."""
+    index = NearDuplicateIndex()
+    extractions = []
+    for name, extraction in _extract_all(job, files, services):
+        original = index.add(name, extraction["text"])
+        if original is None:
+            extractions.append((name, extraction))
+        else:
+            _duplicate(job, services, name, original)
+    return extractions
+
+
+def _prerank(job, files, job_description, top_k, min_local_score, rank_by, semantic, services, vectors):
+    """Extracts every file, ranks them locally and returns [(name, extraction)] worth an LLM call.
+
+    Keyword (BM25) scores are always computed, semantic (embedding) scores when
+    `semantic` is set; `rank_by` picks which one the cut-off applies to. Resumes
+    below the cut-off go straight to job.results with only their local scores.
+    Their document vectors go into `vectors` by text hash, for the talent pool.
+    """
+    extractions = _extract_unique(job, files, services)
+    texts = [extraction["text"] for _, extraction in extractions]
+    scores = {'local_score': local_scores(texts, job_description)}
+    if semantic:
+        job.update(message=f"Embedding {len(texts)} resumes...")
+        try:
+            documents = services.embedder.embed(texts, "retrieval_document") if texts else []
+            scores['semantic_score'] = semantic_scores(texts, job_description, services.embedder, documents)
+            vectors.update(zip((normalized_hash(text) for text in texts), documents))
+        except ScoringFailed as exc:
+            job.notes.append(f"Semantic ranking skipped: the embedding API kept failing ({exc.kind}); ranked by keywords")
+            rank_by = 'local_score'
+    keep = select(scores[rank_by], top_k, min_local_score)
+    selected = []
+    for i, (name, extraction) in enumerate(extractions):
+        extraction['local'] = {col: round(float(values[i]), 1) for col, values in scores.items()}
+        text_hash = normalized_hash(extraction["text"])
+        if keep[i]:
+            selected.append((name, extraction))
+            _checkpoint(job, services, name, "extracted", text_hash, extraction['local'])
+        else:
+            first_line = next((line.strip() for line in extraction["text"].splitlines() if line.strip()), "Unknown")
+            row = {
+                'candidate_name': first_line[:60],
+                'match_score': None,
+                **extraction['local'],
+                'llm_scored': False,
+                'filename': name,
+                'pages_read': extraction["pages_read"],
+                'pages_total': extraction["pages_total"],
+            }
+            job.results.append(row)
+            _checkpoint(job, services, name, "scored", text_hash, row)
+    return selected
+
+
+def _save_to_talent_pool(job, files, services, vectors=None):
+    """Embeds this job's resumes that the pool has not seen yet and appends them.
+
+    `vectors` maps text hashes to document vectors pre-ranking already has; only the
+    rest are embedded. The screening itself is done by now, so an embedding failure
+    only leaves a note.
+    """
+    if services.pool is None:
+        job.notes.append("Talent pool: disabled, so these resumes were not added")
+        return
+    names = {row['filename']: row['candidate_name'] for row in job.results}
+    records = []
+    for name, data in files:
+        extraction = services.text_cache.get(data) # Filled in by this job's extraction
+        if extraction and extraction["text"]:
+            records.append({
+                'content_hash': normalized_hash(extraction["text"]),
+                'filename': name,
+                'candidate_name': names.get(name, "Unknown"),
+                'text': extraction["text"],
+            })
+    new = set(services.pool.missing(record['content_hash'] for record in records))
+    records = [record for record in records if record['content_hash'] in new]
+    if records:
+        vectors = dict(vectors or {})
+        todo = [record for record in records if record['content_hash'] not in vectors]
+        if todo:
+            try:
+                embedded = services.embedder.embed([record['text'] for record in todo], "retrieval_document")
+            except ScoringFailed as exc:
+                job.notes.append(f"Talent pool: not updated, the embedding API kept failing ({exc.kind})")
+                return
+            vectors.update(zip((record['content_hash'] for record in todo), embedded))
+        services.pool.add(records, np.stack([vectors[record['content_hash']] for record in records]))
+    job.notes.append(f"Talent pool: {len(records)} new resumes added, {len(services.pool)} in total")
+
+
+def screen_files(job, files, job_description, services, top_k=0, min_local_score=0, rank_by='local_score',
+                 semantic=False, add_to_pool=False, known=None):
+    """Scores [(name, bytes)] into job.results; files Gemini kept failing on go to job.retry_queue.
+
+    With a top_k or min_local_score cut-off, only resumes that pass a local
+    ranking against the JD are sent to Gemini. `known` maps the byte hash of
+    files already scored for this JD and these settings to their row, which is
+    reused instead of scoring the file again.
+    """
+    files = unique_names(files)
+    job.update(hashes={name: hashlib.sha256(data).hexdigest() for name, data in files})
+    reused = {name: known[digest] for name, digest in job.hashes.items() if digest in (known or {})}
+    if services.store:
+        services.store.start(job, files, {
+            'top_k': top_k, 'min_local_score': min_local_score, 'rank_by': rank_by,
+            'semantic': semantic, 'add_to_pool': add_to_pool,
+        })
+    counts_before = job.counters.stats()
+    unique, copies = exact_duplicates(files, job.hashes)
+    for name, original in copies.items():
+        _duplicate(job, services, name, original)
+
+    local = {}
+    vectors = {} # Text hash -> document vector, when semantic pre-ranking embedded the resume
+    if top_k or min_local_score or semantic:
+        selected = _prerank(job, unique, job_description, top_k, min_local_score, rank_by, semantic, services, vectors)
+        local = {name: extraction['local'] for name, extraction in selected}
+        selected = _reuse(job, selected, reused, local, services)
+        job.update(message=f"Scoring {len(selected)} shortlisted files not scored before ({len(files)} uploaded)...")
+        _score(job, selected, job_description, local, services)
+    else:
+        files_left = _reuse(job, unique, reused, local, services)
+        job.update(message=f"Reading and scoring {len(files_left)} new files ({len(files) - len(files_left)} already scored or copies)...")
+        _score(job, files_left, job_description, local, services)
+    _attach_duplicates(job)
+    if job.copies:
+        job.notes.append(f"Duplicates: {len(job.copies)} files were copies of another resume and were not scored again")
+
+    counts = job.counters.stats() - counts_before
+    job.notes.append(f"Text cache: {counts['text_cache_hits']} hits, {counts['text_cache_misses']} misses this run")
+    job.notes.append(
+        f"Response cache: {counts['response_cache_hits']} hits, {counts['response_cache_misses']} misses this run"
+    )
+    if add_to_pool:
+        _save_to_talent_pool(job, unique, services, vectors)
+    if services.responses:
+        services.responses.flush() # Cache hits keep their access times in memory until a write
+    if services.store:
+        services.store.finish(job.id)
+    job.update(message="Analysis Complete!")
+
+
+def resume_files(job, services):
+    """Finishes a checkpointed single-JD job: files already scored or failed are not sent again.
+
+    Failed files are picked up too once JobStore.retry_failed() has put them back in line.
+    """
+    rows = services.store.files(job.id)
+    _, _, options, _ = services.store.job(job.id)
+    files = [(row["filename"], row["data"]) for row in rows]
+    if (options['top_k'] or options['min_local_score'] or options['semantic']) and any(
+        row["status"] == "pending" for row in rows
+    ):
+        # Interrupted while pre-ranking, before any Gemini call: start over (the text cache has the PDFs)
+        job.update(results=[], retry_queue=[], done=0)
+        screen_files(job, files, job.job_description, services, **options)
+        return
+
+    remaining = [(row["filename"], row["data"]) for row in rows if row["status"] in ("pending", "extracted")]
+    local = {row["filename"]: row["result"] for row in rows if row["status"] == "extracted" and row["result"]}
+    job.update(message=f"Resuming: scoring the remaining {len(remaining)} of {len(files)} files...")
+    _score(job, remaining, job.job_description, local, services)
+    _attach_duplicates(job)
+    if options['add_to_pool']:
+        _save_to_talent_pool(job, files, services)
+    if services.responses:
+        services.responses.flush()
+    services.store.finish(job.id)
+    job.update(message="Analysis Complete!")
+
+
+def _reuse(job, items, reused, local, services):
+    """Adds the rows of already scored files to job.results and returns the items still to score."""
+    left = []
+    for name, value in items:
+        if name in reused and reused[name].get('llm_scored', True):
+            row = {**reused[name], 'filename': name, **local.get(name, {})}
+            row.pop('duplicate_files', None) # Listed again from this run's copies
+            job.results.append(row)
+            _checkpoint(job, services, name, "scored", result=row)
+        else:
+            left.append((name, value))
+    return left
+
+
+def _score(job, items, job_description, local, services):
+    """Runs [(name, bytes or extraction)] through the staged pipeline into job.results.
+
+    Every file is checkpointed as it completes; files Gemini kept failing on go to job.retry_queue.
+    """
+    limiter, breaker = services.limiter, services.breaker
+    pipeline = Pipeline(
+        job_description,
+        limiter,
+        services.max_in_flight,
+        services.timeout,
+        services.text_cache,
+        services.responses,
+        breaker,
+        dedup=NearDuplicateIndex(),
+        batch_tokens=services.batch_tokens,
+        counters=job.counters,
+    )
+    job.update(pipeline=pipeline, done=job.total - len(items)) # Filtered out, copies or finished before a resume
+
+    def sink(name, event, value):
+        if event == "extracted":
+            _checkpoint(job, services, name, "extracted", normalized_hash(value["text"]))
+            return
+        if event == "duplicate":
+            _duplicate(job, services, name, value)
+        elif event == "scored":
+            value['filename'] = name # Add filename for reference
+            if name in local:
+                value.update(local[name])
+                value['llm_scored'] = True
+            job.results.append(value)
+            _checkpoint(job, services, name, "scored", result=value)
+        elif event == "failed":
+            job.retry_queue.append(name)
+            _checkpoint(job, services, name, "failed", error=value.kind)
+        else:
+            _checkpoint(job, services, name, "failed", error=UNREADABLE)
+        if services.store:
+            services.store.flush()
+
+        levels = limiter.fill_levels()
+        state, remaining = breaker.state()
+        paused = f" Paused after repeated API errors, resuming in {remaining:.0f}s." if state == "open" else ""
+        what = f"Skipped {name}, a copy of {value}" if event == "duplicate" else f"Scored {name}"
+        job.step(
+            f"{what} ({job.done + 1}/{job.total}) "
+            f"(quota left: {levels['requests']:.0%} requests, {levels['tokens']:.0%} tokens)" + paused
+        )
+
+    counts_before = job.counters.stats()
+    asyncio.run_coroutine_threadsafe(pipeline.run(items, sink), get_event_loop()).result()
+    fixed = job.counters.stats() - counts_before
+    if fixed["replies_repaired"] or fixed["replies_reasked"] or fixed["replies_unusable"]:
+        job.notes.append(
+            f"Responses: {fixed['replies_repaired']} repaired locally, {fixed['replies_reasked']} re-asked, "
+            f"{fixed['replies_unusable']} unusable this run"
+        )
+    if pipeline.jd_cuts:
+        job.notes.append(f"Prompt budget: the job description was trimmed ({'; '.join(pipeline.jd_cuts)})")
+    trimmed = sum(1 for row in job.results if row.get('prompt_cuts'))
+    if trimmed:
+        job.notes.append(f"Prompt budget: {trimmed} resumes were trimmed to fit; their details list what was cut")
+    context = pipeline.context_stats()
+    if context:
+        calls, cached, saved = context
+        job.notes.append(
+            f"Context cache: {calls} calls read {cached} prompt tokens from the cached job description, "
+            f"{saved} tokens not sent again"
+        )
+    batches = pipeline.batch_stats()
+    if batches and batches[0]:
+        job.notes.append(
+            f"Batching: {batches[1]} resumes scored in {batches[0]} shared requests, {batches[2]} needed a call of their own"
+        )
+
+
+def screen_roles(job, files, roles, top_k, services):
+    """Screens [(name, bytes)] against several (title, job_description) roles in one pass.
+
+    Each resume is extracted once, an N x M similarity matrix ranks every resume
+    for every role, and Gemini only scores the top_k candidates of each role.
+    Copies and near-duplicates of an earlier resume are left out of the matrix.
+    Pairs Gemini kept failing on get one more pass at the end; files that still
+    have no score, or could not be read, are listed in job.notes and job.retry_queue.
+    """
+    files = unique_names(files)
+    job.update(hashes={name: hashlib.sha256(data).hexdigest() for name, data in files})
+    unique, copies = exact_duplicates(files, job.hashes)
+    job.copies.update(copies)
+    extractions = _extract_unique(job, unique, services)
+    names = [name for name, _ in extractions]
+    timed_out = list(job.retry_queue) # _extract_all queued the files whose extraction timed out
+    unreadable = [name for name, _ in unique if name not in set(names) | set(timed_out) | set(job.copies)]
+
+    job.update(message=f"Matching {len(names)} resumes to {len(roles)} roles...")
+    similarity = similarity_matrix(
+        [extraction["text"] for _, extraction in extractions], [jd for _, jd in roles], services.embedder
+    )
+    shortlist = top_k_per_column(similarity, top_k)
+    items = [
+        ((i, j), extractions[i][1], roles[j][1]) for i, j in zip(*np.nonzero(shortlist))
+    ]
+    job.update(total=len(items))
+
+    match = np.full(similarity.shape, np.nan)
+    leaderboards = {title: [] for title, _ in roles}
+
+    def score(pairs, last):
+        """Scores the pairs into match and leaderboards; returns {(i, j): ScoringFailed} of those that failed."""
+        futures = analyze_pairs(pairs, services.limiter, services.max_in_flight, services.responses, services.breaker)
+        failed = {}
+        for future in as_completed(futures):
+            i, j = futures[future]
+            try:
+                data = future.result()
+            except ScoringFailed as exc:
+                failed[i, j] = exc
+                if not last:
+                    continue # Counted once the retry pass settles it
+                data = None
+            if data:
+                match[i, j] = pd.to_numeric(data.get('match_score'), errors='coerce')
+                data['filename'] = names[i]
+                data['semantic_score'] = round(float(similarity[i, j]), 1)
+                leaderboards[roles[j][0]].append(data)
+            job.step(f"Scored {names[i]} for {roles[j][0]} ({job.done + 1}/{len(items)})")
+        return failed
+
+    failed = score(items, last=False)
+    if failed:
+        job.update(message=f"Retrying {len(failed)} candidate/role pairs Gemini failed on...")
+        failed = score([item for item in items if item[0] in failed], last=True)
+
+    if unreadable:
+        job.notes.append(f"Unreadable: {len(unreadable)} files had no text and were not matched ({', '.join(unreadable)})")
+    if timed_out:
+        job.notes.append(f"Timed out: {len(timed_out)} files took too long to read ({', '.join(timed_out)})")
+    if failed:
+        job.notes.append(
+            f"Not scored: Gemini kept failing on {len(failed)} candidate/role pairs, which have no match score ("
+            + ", ".join(f"{names[i]} for {roles[j][0]}: {exc.kind}" for (i, j), exc in failed.items()) + ")"
+        )
+        job.retry_queue.extend(sorted({names[i] for i, _ in failed} - set(job.retry_queue)))
+    _attach_duplicates(job, [row for rows in leaderboards.values() for row in rows])
+    if job.copies:
+        job.notes.append(f"Duplicates: {len(job.copies)} files were copies of another resume and were not matched again")
+
+    if services.responses:
+        services.responses.flush()
+
+    grid = pd.DataFrame(index=pd.Index(names, name='filename'))
+    for j, (title, _) in enumerate(roles):
+        grid[f"{title} | similarity"] = similarity[:, j].round(1)
+        grid[f"{title} | match_score"] = match[:, j]
+    job.update(
+        role_results={'leaderboards': leaderboards, 'grid': grid.reset_index()},
+        message=f"Analysis Complete! {len(items)} Gemini calls for {len(names)} resumes x {len(roles)} roles.",
+    )
+
+
+def polish_emails(candidates, template, role, sender, job_description, services):
+    """Has Gemini polish the `template` email of each scored candidate, a few at a time; returns how many failed.
+
+    The polished text is kept as the row's email_draft. Only the candidates a recruiter
+    picks get here; everyone else's email is rendered locally for free.
+    """
+    todo = [candidate for candidate in candidates if candidate.get('llm_scored', True)]
+
+    async def draft_all():
+        semaphore = asyncio.Semaphore(services.max_in_flight)
+
+        async def draft(candidate):
+            async with semaphore:
+                try:
+                    candidate['email_draft'] = await polish_email_async(
+                        render(template, candidate, role, sender), candidate, job_description,
+                        services.limiter, services.breaker, services.responses,
+                    )
+                except ScoringFailed:
+                    return False
+            return True
+
+        return await asyncio.gather(*(draft(candidate) for candidate in todo))
+
+    return asyncio.run_coroutine_threadsafe(draft_all(), get_event_loop()).result().count(False)
@@ -0,0 +1,336 @@
+"""Staged screening: extract -> build prompt [-> batch] -> Gemini -> sink, joined by bounded queues.
+
+Every stage runs its own workers and only pulls the next item once the queue
+after it has room, so a slow stage holds back the ones before it instead of
+piling work up in memory: at most QUEUE_SIZE items wait between any two stages,
+however many files the source yields.
+"""
+import asyncio
+import os
+import time
+
+from batching import BATCH_LINGER, MAX_BATCH, batch_prompt, build_batch_prompt, resume_ids, split_batch
+from counters import Counters, counting
+from context_cache import MIN_CACHE_TOKENS, cache_job_description, resume_prompt
+from prompt_budget import fit_job_description, fit_resume
+from rate_limiter import estimate_tokens
+from retry import FATAL, MALFORMED, ScoringFailed
+from screener import (BATCH_CONFIG, EXTRACT_TIMEOUT, MAX_IN_FLIGHT, MODEL_NAME, build_prompt, call_gemini_async,
+                      extract_async, get_model, response_key, validated_async)
+
+QUEUE_SIZE = 16 # Items waiting between two stages
+EXTRACT_WORKERS = os.cpu_count() or 1
+
+
+class Stage:
+    """Counters of one stage: items finished, seconds spent working, and its input queue."""
+
+    def __init__(self, name, workers, queue):
+        self.name = name
+        self.workers = workers
+        self.queue = queue
+        self.done = 0
+        self.busy = 0.0
+
+
+class Pipeline:
+    """Screens (key, pdf_bytes) items against one JD and hands every outcome to a sink.
+
+    The sink is called as sink(key, event, value) from a worker thread, one call at a
+    time, with event "extracted" (value: the extraction), "scored" (the analysis),
+    "unreadable" (None) or "failed" (the ScoringFailed, also for a PDF whose extraction
+    timed out). Items may also come as (key, extraction) when the text was extracted
+    earlier; they skip the extract stage.
+    With a dedup.NearDuplicateIndex, a text that nearly matches one seen earlier in the
+    run is not scored; the sink gets "duplicate" with the earlier key instead.
+
+    With `context_cache` the instructions and JD are registered as Gemini cached content
+    before the first call and each request only carries the resume; when the JD is too
+    short to cache, or the cache cannot be created or used, prompts are sent inline.
+    A cached JD goes in whole: once it is cached its length no longer costs per call.
+
+    With `batch_tokens` a batch stage packs resumes into one request until their
+    estimated tokens reach it (or MAX_BATCH resumes, or nothing new came for
+    BATCH_LINGER seconds); resumes the reply leaves out or mangles are scored alone.
+
+    Cache hits and misses and reply repairs of the run are tallied in `counters`.
+
+    Resumes and the JD are held to their prompt_budget limits; a scored resume that
+    had to be trimmed lists the cuts under 'prompt_cuts', the JD's (when it went inline)
+    are in `jd_cuts`.
+    """
+
+    def __init__(self, job_description, limiter=None, max_in_flight=MAX_IN_FLIGHT, timeout=EXTRACT_TIMEOUT,
+                 text_cache=None, response_cache=None, breaker=None, extract_workers=EXTRACT_WORKERS,
+                 queue_size=QUEUE_SIZE, dedup=None, context_cache=True, min_cache_tokens=MIN_CACHE_TOKENS,
+                 batch_tokens=0, max_batch=MAX_BATCH, linger=BATCH_LINGER, counters=None):
+        self.job_description = job_description
+        self.prompt_jd, self.prompt_jd_cuts = fit_job_description(job_description)
+        self.limiter = limiter
+        self.timeout = timeout
+        self.text_cache = text_cache
+        self.response_cache = response_cache
+        self.breaker = breaker
+        self.dedup = dedup
+        self.context_cache = context_cache
+        self.min_cache_tokens = min_cache_tokens
+        self.context = None
+        self.context_tried = False
+        self.context_lock = None
+        self.batch_tokens = batch_tokens
+        self.max_batch = max_batch
+        self.linger = linger
+        self.batches = 0
+        self.batched = 0
+        self.fallbacks = 0
+        self.queue_size = queue_size
+        self.counters = counters or Counters()
+        self.workers = {"extract": extract_workers, "prompt": 1, "gemini": max_in_flight, "sink": 1}
+        if batch_tokens:
+            self.workers = {"extract": extract_workers, "prompt": 1, "batch": 1, "gemini": max_in_flight, "sink": 1}
+        self.stages = {}
+        self.started = None
+        self.error = None
+
+    async def run(self, items, sink):
+        """Pushes every item of the iterable `items` through the stages; returns once the sink saw them all."""
+        with counting(self.counters): # Inherited by every stage task and to_thread call below
+            await self._run(items, sink)
+
+    async def _run(self, items, sink):
+        self.started = time.perf_counter()
+        self.stages = {name: Stage(name, workers, asyncio.Queue(self.queue_size)) for name, workers in self.workers.items()}
+        queues = {name: stage.queue for name, stage in self.stages.items()}
+        steps = {
+            "extract": self._extract,
+            "prompt": self._prompt,
+            "gemini": self._call,
+            "sink": lambda item: self._sink(sink, item),
+        }
+        self.outputs = {
+            "extracted": queues["prompt"],
+            "prompt": queues.get("batch", queues["gemini"]),
+            "batch": queues["gemini"],
+            "result": queues["sink"],
+        }
+        self.context_lock = asyncio.Lock()
+        tasks = [
+            asyncio.create_task(
+                self._batcher(self.stages[name]) if name == "batch" else self._worker(self.stages[name], steps[name])
+            )
+            for name in self.workers for _ in range(self.workers[name])
+        ]
+        try:
+            for item in items:
+                await queues["extract"].put(item)
+            for queue in queues.values(): # Each stage is drained before the next one can be
+                await queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self.context:
+                await asyncio.to_thread(self.context.delete)
+        if self.error:
+            raise self.error
+
+    async def _worker(self, stage, step):
+        while True:
+            item = await stage.queue.get()
+            began = time.perf_counter()
+            try:
+                outputs = await step(item)
+            except Exception as exc:
+                # Keep draining so the run can finish; the first error is re-raised by run()
+                self.error = self.error or exc
+                outputs = []
+            # Time blocked on a full queue downstream is not this stage's work
+            stage.busy += time.perf_counter() - began
+            stage.done += 1
+            try:
+                for queue, output in outputs:
+                    await queue.put(output)
+            finally:
+                stage.queue.task_done()
+
+    async def _extract(self, item):
+        key, data = item
+        try:
+            extraction = data if isinstance(data, dict) else await extract_async(data, self.timeout, self.text_cache)
+        except ScoringFailed as exc:
+            return [(self.outputs["result"], (key, "failed", exc))] # Timed out; a later pass may manage
+        if not extraction or not extraction["text"]:
+            return [(self.outputs["result"], (key, "unreadable", None))]
+        if self.dedup:
+            signature = await asyncio.to_thread(self.dedup.hasher.signature, extraction["text"])
+            original = self.dedup.add_signature(key, signature) # On the loop thread, so the index needs no lock
+            if original is not None:
+                return [
+                    (self.outputs["result"], (key, "extracted", extraction)),
+                    (self.outputs["result"], (key, "duplicate", original)),
+                ]
+        return [
+            (self.outputs["result"], (key, "extracted", extraction)),
+            (self.outputs["extracted"], (key, extraction)),
+        ]
+
+    async def _prompt(self, item):
+        key, extraction = item
+        cache_key = response_key(extraction["text"], self.job_description) if self.response_cache else None
+        # From here on the text is what Gemini sees; the sink already has the full one
+        text, cuts = fit_resume(extraction["text"])
+        extraction = {**extraction, "text": text, "prompt_cuts": cuts}
+        if cache_key:
+            data = await asyncio.to_thread(self.response_cache.get, cache_key)
+            if data is not None:
+                return [(self.outputs["result"], (key, "scored", self._with_pages(data, extraction)))]
+        return [(self.outputs["prompt"], (key, extraction, cache_key))]
+
+    async def _batcher(self, stage):
+        """Packs (key, extraction, cache_key) items into lists that _call() sends as one request."""
+        held = None # The item that did not fit the last batch; it opens the next one
+        while True:
+            batch = [held or await stage.queue.get()]
+            held = None
+            tokens = estimate_tokens(batch[0][1]["text"])
+            while len(batch) < self.max_batch:
+                try:
+                    # The wait starts over with every item: a batch goes once the stream pauses for `linger`
+                    item = await asyncio.wait_for(stage.queue.get(), self.linger)
+                except asyncio.TimeoutError:
+                    break
+                size = estimate_tokens(item[1]["text"])
+                if tokens + size > self.batch_tokens:
+                    held = item
+                    break
+                batch.append(item)
+                tokens += size
+            stage.done += len(batch)
+            try:
+                await self.outputs["batch"].put(batch)
+            finally:
+                for _ in batch:
+                    stage.queue.task_done()
+
+    async def _context(self):
+        """Creates the JD's cached content before the first Gemini call; None means inline prompts."""
+        if not self.context_cache:
+            return None
+        async with self.context_lock:
+            if not self.context_tried:
+                self.context = await asyncio.to_thread(cache_job_description, self.job_description, self.min_cache_tokens)
+                self.context_tried = True
+        return self.context if self.context_cache else None
+
+    async def _call(self, item):
+        if isinstance(item, list):
+            return await self._call_batch(item)
+        return [await self._call_one(*item)]
+
+    async def _call_one(self, key, extraction, cache_key):
+        context = await self._context()
+        if context:
+            prompt = resume_prompt(extraction["text"])
+        else:
+            prompt = build_prompt(extraction["text"], self.prompt_jd)
+        try:
+            data = await call_gemini_async(prompt, self.limiter, self.breaker, context=context)
+        except ScoringFailed as exc:
+            if not (context and exc.kind == FATAL):
+                return (self.outputs["result"], (key, "failed", exc))
+            # The cached content expired or was refused: this and every later prompt go inline
+            self.context_cache = False
+            try:
+                data = await call_gemini_async(
+                    build_prompt(extraction["text"], self.prompt_jd), self.limiter, self.breaker
+                )
+            except ScoringFailed as exc:
+                return (self.outputs["result"], (key, "failed", exc))
+        try:
+            data = await validated_async(data, build_prompt(extraction["text"], self.prompt_jd), self.limiter, self.breaker)
+        except ScoringFailed as exc:
+            return (self.outputs["result"], (key, "failed", exc))
+        return await self._scored(key, extraction, cache_key, data)
+
+    async def _call_batch(self, batch):
+        if len(batch) == 1:
+            return [await self._call_one(*batch[0])]
+        context = await self._context()
+        resumes = list(zip(resume_ids(len(batch)), (extraction["text"] for _, extraction, _ in batch)))
+        if context:
+            prompt = batch_prompt(resumes)
+        else:
+            prompt = build_batch_prompt(resumes, self.prompt_jd)
+        try:
+            records = split_batch(
+                await call_gemini_async(
+                    prompt, self.limiter, self.breaker, context=context,
+                    model=context.batch_model if context else get_model(MODEL_NAME, BATCH_CONFIG),
+                ),
+                [resume_id for resume_id, _ in resumes],
+            )
+        except ScoringFailed as exc:
+            if exc.kind not in (FATAL, MALFORMED):
+                return [(self.outputs["result"], (key, "failed", exc)) for key, _, _ in batch]
+            if context and exc.kind == FATAL:
+                self.context_cache = False
+            records = {} # A reply that never parsed, or a refused cache: score them one by one
+        self.batches += 1
+        self.batched += len(records)
+        outputs = []
+        for (resume_id, _), (key, extraction, cache_key) in zip(resumes, batch):
+            if resume_id in records:
+                outputs.append(await self._scored(key, extraction, cache_key, records[resume_id]))
+            else:
+                self.fallbacks += 1
+                outputs.append(await self._call_one(key, extraction, cache_key))
+        return outputs
+
+    async def _scored(self, key, extraction, cache_key, data):
+        if cache_key:
+            await asyncio.to_thread(self.response_cache.put, cache_key, data)
+        return (self.outputs["result"], (key, "scored", self._with_pages(data, extraction)))
+
+    async def _sink(self, sink, item):
+        await asyncio.to_thread(sink, *item)
+        return []
+
+    @staticmethod
+    def _with_pages(data, extraction):
+        data['pages_read'] = extraction["pages_read"]
+        data['pages_total'] = extraction["pages_total"]
+        if extraction.get("prompt_cuts"):
+            data['prompt_cuts'] = extraction["prompt_cuts"]
+        return data
+
+    @property
+    def jd_cuts(self):
+        """What the inline prompts left out of the JD; nothing when it was only sent as cached content."""
+        return [] if self.context and self.context_cache else self.prompt_jd_cuts
+
+    def context_stats(self):
+        """(calls, tokens served from the JD cache, tokens not re-sent), or None when prompts went inline."""
+        if not self.context:
+            return None
+        return self.context.calls, self.context.cached_tokens, self.context.tokens_saved()
+
+    def batch_stats(self):
+        """(batched requests, resumes scored by them, resumes that needed a call of their own), or None."""
+        if not self.batch_tokens:
+            return None
+        return self.batches, self.batched, self.fallbacks
+
+    def stats(self):
+        """Per stage: workers, queue depth, items done, items/sec and busy share (the bottleneck nears 100%)."""
+        elapsed = max(1e-9, time.perf_counter() - self.started) if self.started else 1e-9
+        return [
+            {
+                "stage": stage.name,
+                "workers": stage.workers,
+                "queue": stage.queue.qsize(),
+                "done": stage.done,
+                "per_sec": round(stage.done / elapsed, 2),
+                "busy": round(min(1.0, stage.busy / (stage.workers * elapsed)), 2),
+            }
+            for stage in self.stages.values()
+        ]
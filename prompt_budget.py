@@ -0,0 +1,104 @@
+"""Per-section token budgets for prompts, trimming the least useful text first.
+
+Text over its budget loses, in order: copies of lines repeated on every page
+(headers, footers) and page numbers, whole low-value sections such as references or
+publication lists, and finally its tail. Every cut is recorded so the
+leaderboard can say what Gemini never saw.
+"""
+import collections
+import re
+
+from rate_limiter import estimate_tokens
+
+RESUME_TOKENS = 8_000
+JD_TOKENS = 3_000
+REPEATED = 3 # A short line seen this often is a page header or footer
+NEWLINE_WINDOW = 200 # Characters the final cut may back off to end on a whole line
+# Dropped first to last while the text is over budget
+RESUME_DROP = ["references", "publications", "presentations", "conferences", "patents", "hobbies", "interests",
+               "volunteering", "awards", "courses"]
+JD_DROP = ["equal opportunity", "about us", "benefits", "perks", "how to apply", "appendix", "company overview"]
+# Headings that end a section without being dropped themselves
+HEADINGS = ["experience", "work experience", "professional experience", "employment", "employment history",
+            "education", "skills", "technical skills", "projects", "summary", "profile", "certifications",
+            "languages", "responsibilities", "requirements", "qualifications", "what you will do", "about the role"]
+# "Page 2", "Page 2 of 5", "2 of 5"; a bare number may be a year, and those date the candidate's jobs
+PAGE_NUMBER = re.compile(r"^(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s+of\s+\d+)$", re.IGNORECASE)
+TRUNCATED = "[Truncated]"
+
+
+def _heading(line, names):
+    """The entry of `names` a short line announces (e.g. "SELECTED PUBLICATIONS:"), or None."""
+    words = re.sub(r"[^a-z ]", " ", line.lower()).split()
+    if not words or len(words) > 4:
+        return None
+    normalized = " ".join(words)
+    for name in names:
+        if normalized == name or normalized.endswith(" " + name):
+            return name
+    return None
+
+
+def _drop_repeated(lines):
+    counts = collections.Counter(line.strip() for line in lines if line.strip())
+    repeated = {
+        line for line, count in counts.items()
+        if count >= REPEATED and len(line) <= 80 and not _heading(line, HEADINGS)
+    }
+    kept, seen = [], set()
+    for line in lines:
+        key = line.strip()
+        if PAGE_NUMBER.match(key) or key in seen:
+            continue
+        if key in repeated:
+            seen.add(key) # The first copy stays; it may be the candidate's name
+        kept.append(line)
+    return kept, len(lines) - len(kept)
+
+
+def _drop_section(lines, name, headings):
+    """`lines` without the section headed `name` (up to the next known heading), and how many lines went."""
+    kept, dropping = [], False
+    for line in lines:
+        heading = _heading(line, headings)
+        if heading:
+            dropping = heading == name
+        if not dropping:
+            kept.append(line)
+    return kept, len(lines) - len(kept)
+
+
+def fit(text, budget, drop=RESUME_DROP):
+    """(text within `budget` tokens, [what was cut]); text that already fits comes back as it is."""
+    if estimate_tokens(text) <= budget:
+        return text, []
+    cuts = []
+    lines = text.splitlines()
+    lines, removed = _drop_repeated(lines)
+    if removed:
+        cuts.append(f"{removed} repeated header, footer and page-number lines")
+    headings = drop + HEADINGS
+    for name in drop:
+        if estimate_tokens("\n".join(lines)) <= budget:
+            break
+        before = estimate_tokens("\n".join(lines))
+        lines, removed = _drop_section(lines, name, headings)
+        if removed:
+            cuts.append(f"{name} ({before - estimate_tokens(chr(10).join(lines))} tokens)")
+    text = "\n".join(lines)
+    over = estimate_tokens(text) - budget
+    if over > 0:
+        limit = budget * 4 - len(TRUNCATED) - 1
+        end = text.rfind("\n", max(0, limit - NEWLINE_WINDOW), limit)
+        end = end if end > 0 else limit
+        cuts.append(f"end of text ({estimate_tokens(text[end:])} tokens)")
+        text = text[:end] + "\n" + TRUNCATED
+    return text, cuts
+
+
+def fit_resume(text, budget=RESUME_TOKENS):
+    return fit(text, budget, RESUME_DROP)
+
+
+def fit_job_description(text, budget=JD_TOKENS):
+    return fit(text, budget, JD_DROP)
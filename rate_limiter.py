@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+
+# Published per-model quotas as (requests per minute, tokens per minute).
+# Override with GEMINI_RPM / GEMINI_TPM in secrets if your tier differs.
+MODEL_LIMITS = {
+    "gemini-1.5-flash": (15, 1_000_000),
+    "gemini-1.5-pro": (2, 32_000),
+    "text-embedding-004": (1_500, 1_000_000), # Its own quota, separate from the generation models'
+}
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) used before the real usage is known."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """A bucket that refills continuously up to `capacity` at `capacity` per minute."""
+
+    def __init__(self, capacity, clock=time.monotonic):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / 60.0
+        self.clock = clock
+        self.level = self.capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount):
+        """Takes `amount` (going into debt if needed) and returns the seconds to wait."""
+        self._refill()
+        self.level -= min(amount, self.capacity)
+        if self.level >= 0:
+            return 0.0
+        return -self.level / self.rate
+
+    def give(self, amount):
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+    def fill(self):
+        self._refill()
+        return max(0.0, self.level) / self.capacity
+
+
+class RateLimiter:
+    """Tracks the RPM and TPM budgets of one model and only blocks when one is exhausted."""
+
+    def __init__(self, rpm, tpm, clock=time.monotonic, sleep=time.sleep):
+        self.requests = TokenBucket(rpm, clock)
+        self.tokens = TokenBucket(tpm, clock)
+        self.sleep = sleep
+        self.lock = threading.Lock()
+
+    @classmethod
+    def for_model(cls, model_name, rpm=None, tpm=None):
+        default_rpm, default_tpm = MODEL_LIMITS.get(model_name, (15, 1_000_000))
+        return cls(rpm or default_rpm, tpm or default_tpm)
+
+    def reserve(self, tokens):
+        """Books one request of `tokens` and returns how long the caller must wait before sending it."""
+        with self.lock:
+            return max(self.requests.take(1), self.tokens.take(tokens))
+
+    def acquire(self, tokens):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def record_usage(self, estimated, actual):
+        """Corrects the token bucket once the real usage of a request is known."""
+        if actual is None:
+            return
+        with self.lock:
+            if actual < estimated:
+                self.tokens.give(estimated - actual)
+            elif actual > estimated:
+                self.tokens.take(actual - estimated)
+
+    def fill_levels(self):
+        """Remaining share (0-1) of the request and token budgets, for the progress UI."""
+        with self.lock:
+            return {"requests": self.requests.fill(), "tokens": self.tokens.fill()}
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from counters import count
+
+DEFAULT_PATH = os.path.join(".cache", "responses.sqlite3")
+DEFAULT_TTL = 30 * 24 * 3600 # Seconds
+DEFAULT_MAX_ENTRIES = 50_000
+EVICT_EVERY = 100 # Puts between eviction sweeps
+TOUCH_EVERY = 100 # Hits whose access times are written in one transaction
+
+
+def normalized_hash(text):
+    """Hash that ignores whitespace-only differences (re-extraction, pasted JD formatting)."""
+    return hashlib.sha256(re.sub(r"\s+", " ", text).strip().encode("utf-8")).hexdigest()
+
+
+def cache_key(resume_text, job_description, prompt_version, model_name, generation_config):
+    parts = [
+        normalized_hash(resume_text),
+        normalized_hash(job_description),
+        str(prompt_version),
+        model_name,
+        json.dumps(generation_config, sort_keys=True),
+    ]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Parsed Gemini responses in SQLite with a TTL and least-recently-used eviction.
+
+    A hit only records its access time in memory; they are written with the next put,
+    every TOUCH_EVERY hits, or on flush(), so a hit costs a read and no commit.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.touched = {} # key -> access time not written yet
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                count("response_cache_misses")
+                return None
+            self.hits += 1
+            count("response_cache_hits")
+            self.touched[key] = now
+            if len(self.touched) >= TOUCH_EVERY:
+                self._touch()
+                self.conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, response):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(response), now, now),
+            )
+            self.puts += 1
+            self._touch()
+            if self.puts % EVICT_EVERY == 0:
+                self._evict(now)
+            self.conn.commit()
+
+    def flush(self):
+        """Writes the access times of hits since the last write."""
+        with self.lock:
+            self._touch()
+            self.conn.commit()
+
+    def _touch(self):
+        if self.touched:
+            self.conn.executemany(
+                "UPDATE responses SET accessed = ? WHERE key = ?", [(at, key) for key, at in self.touched.items()]
+            )
+            self.touched = {}
+
+    def _evict(self, now):
+        self.conn.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl,))
+        self.conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}
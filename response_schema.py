@@ -0,0 +1,217 @@
+"""The analysis schema Gemini is held to, and what happens when a reply still misses it.
+
+A reply goes through three steps:
+- repair_json() fixes common syntax slips locally: code fences, trailing commas,
+  "85%" numbers and replies cut off mid-object.
+- validate_analysis() checks and coerces every field. It is compiled once from
+  RESPONSE_SCHEMA into one checker per field, so a call does no schema walking.
+- Fields that still fail are asked for again on their own (screener.validated_async).
+"""
+import json
+import re
+import threading
+
+from counters import count
+
+ANALYSIS_PROPERTIES = {
+    "candidate_name": {"type": "string"},
+    "match_score": {"type": "integer"},
+    "years_experience": {"type": "string"},
+    "key_skills": {"type": "array", "items": {"type": "string"}},
+    "summary": {"type": "string"},
+    "red_flags": {"type": "string"},
+}
+# Passed to Gemini as response_schema; the OpenAPI subset it accepts has no numeric ranges
+RESPONSE_SCHEMA = {"type": "object", "properties": ANALYSIS_PROPERTIES, "required": list(ANALYSIS_PROPERTIES)}
+BATCH_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"resume_id": {"type": "string"}, **ANALYSIS_PROPERTIES},
+        "required": ["resume_id", *ANALYSIS_PROPERTIES],
+    },
+}
+RANGES = {"match_score": (0, 100)}
+CRITICAL = {"match_score"} # A candidate without these cannot be ranked; the rest fall back to DEFAULTS
+DEFAULTS = {"candidate_name": "Unknown", "years_experience": "Unknown", "key_skills": [], "summary": "", "red_flags": "None"}
+DESCRIPTIONS = {
+    "candidate_name": "string",
+    "match_score": "integer 0-100",
+    "years_experience": "string",
+    "key_skills": "array of strings",
+    "summary": "string",
+    "red_flags": "string",
+}
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+class ResponseStats:
+    """Running counts of replies checked, repaired locally, re-asked and given up on."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {"checked": 0, "repaired": 0, "reasked": 0, "unusable": 0}
+
+    def add(self, name, n=1):
+        with self.lock:
+            self.counts[name] += n
+        count(f"replies_{name}", n) # The job's own share, for its notes
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts)
+
+
+STATS = ResponseStats()
+
+
+# --- REPAIR ---
+def _close(text):
+    """`text` with an unterminated string, a dangling key or separator, and every open bracket closed."""
+    stack, in_string, escaped = [], False, False
+    member, has_value = 0, False # Where the innermost open member starts (its "{", "[" or ","), and if it got its ":"
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(("}" if char == "{" else "]", member))
+            member, has_value = i, False
+        elif char in "}]" and stack:
+            member, has_value = stack.pop()[1], True
+        elif char == ",":
+            member, has_value = i, False
+        elif char == ":":
+            has_value = True
+    if in_string:
+        text += '"'
+    text = text.rstrip().rstrip(",")
+    if stack and stack[-1][0] == "}":
+        if not has_value: # A key without its value: drop it, back to the last complete member
+            text = text[:member + 1].rstrip(",")
+        elif text.endswith(":"):
+            text += " null"
+    return text + "".join(closer for closer, _ in reversed(stack))
+
+
+def repair_json(text):
+    """Parses a reply, fixing the usual slips if it does not parse as it is; ValueError when nothing helps."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    fixed = re.sub(r"^\s*```(?:json)?|```\s*$", "", text).strip()
+    fixed = re.sub(r'":\s*(-?\d+(?:\.\d+)?)\s*%', r'": \1', fixed) # "match_score": 85%
+    fixed = re.sub(r",\s*([}\]])", r"\1", _close(fixed))
+    data = json.loads(fixed)
+    STATS.add("repaired")
+    return data
+
+
+# --- VALIDATION ---
+def _string(value):
+    if value is None or isinstance(value, (dict, list)):
+        raise ValueError("expected a string")
+    return value.strip() if isinstance(value, str) else str(value)
+
+
+def _integer(name):
+    low, high = RANGES.get(name, (float("-inf"), float("inf")))
+
+    def check(value):
+        if isinstance(value, bool):
+            raise ValueError("expected an integer")
+        if isinstance(value, str):
+            numbers = _NUMBER.findall(value)
+            if not numbers:
+                raise ValueError("expected an integer")
+            number = float(numbers[0])
+            if "/" in value and len(numbers) > 1 and float(numbers[1]) and high == 100:
+                number = number / float(numbers[1]) * 100 # "8/10"
+            value = number
+        if not isinstance(value, (int, float)):
+            raise ValueError("expected an integer")
+        value = int(round(value))
+        if not low <= value <= high:
+            raise ValueError(f"out of range {low}-{high}")
+        return value
+
+    return check
+
+
+def _string_array(value):
+    if isinstance(value, str):
+        value = re.split(r"[,;\n]", value)
+    if not isinstance(value, list):
+        raise ValueError("expected an array of strings")
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def compile_validator(properties):
+    """validate(data, fields=None) -> (clean, errors) with one prebuilt checker per property.
+
+    `clean` holds every field that passed (coerced to its type) plus unknown keys as they
+    were; `errors` maps each failed or missing field (of `fields`, default all) to why.
+    """
+    checkers = {}
+    for name, prop in properties.items():
+        if prop["type"] == "integer":
+            checkers[name] = _integer(name)
+        elif prop["type"] == "array":
+            checkers[name] = _string_array
+        else:
+            checkers[name] = _string
+
+    def validate(data, fields=None):
+        STATS.add("checked")
+        wanted = checkers if fields is None else {name: checkers[name] for name in fields if name in checkers}
+        if not isinstance(data, dict):
+            return {}, {name: "reply was not an object" for name in wanted}
+        clean = {key: value for key, value in data.items() if key not in checkers}
+        errors = {}
+        coerced = False
+        for name, check in wanted.items():
+            if name not in data:
+                errors[name] = "missing"
+                continue
+            try:
+                clean[name] = check(data[name])
+            except ValueError as exc:
+                errors[name] = str(exc)
+                continue
+            coerced = coerced or type(clean[name]) is not type(data[name])
+        if coerced:
+            STATS.add("repaired")
+        return clean, errors
+
+    return validate
+
+
+validate_analysis = compile_validator(ANALYSIS_PROPERTIES)
+
+
+def reask_prompt(prompt, errors):
+    """`prompt` again, asking only for the fields in `errors`."""
+    fields = ", ".join(f'"{name}" ({DESCRIPTIONS[name]})' for name in errors)
+    return prompt + f"""
+    Your previous answer had missing or invalid values for: {fields}.
+    Return a JSON object with only those keys, with valid values.
+    """
+
+
+def finish(data, errors):
+    """`data` with DEFAULTS for the fields that stayed invalid; ValueError if a CRITICAL one did."""
+    critical = CRITICAL & set(errors)
+    if critical:
+        STATS.add("unusable")
+        raise ValueError(f"unusable reply: {', '.join(f'{name} {errors[name]}' for name in critical)}")
+    for name in errors:
+        data[name] = DEFAULTS[name]
+    return data
@@ -0,0 +1,118 @@
+import asyncio
+import collections
+import json
+import random
+import threading
+import time
+
+# Error classes, from classify_error()
+QUOTA = "quota"
+SERVER = "server"
+TIMEOUT = "timeout"
+MALFORMED = "malformed"
+FATAL = "fatal"
+
+RETRYABLE = {QUOTA, SERVER, TIMEOUT, MALFORMED}
+
+
+def classify_error(exc):
+    """Maps an exception from a Gemini call (or from parsing its reply) to one of the classes above."""
+    code = getattr(exc, "code", None) # google.api_core exceptions carry the HTTP status
+    if code == 429:
+        return QUOTA
+    if isinstance(code, int) and code >= 500:
+        return SERVER
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError)) or type(exc).__name__ == "DeadlineExceeded":
+        return TIMEOUT
+    if isinstance(exc, (json.JSONDecodeError, ValueError)):
+        # ValueError also covers response.text on an empty or blocked candidate
+        return MALFORMED
+    return FATAL
+
+
+class ScoringFailed(Exception):
+    """Raised when a resume could not be scored, so callers can queue it for a later pass."""
+
+    def __init__(self, kind, cause):
+        super().__init__(f"{kind}: {cause}")
+        self.kind = kind
+        self.cause = cause
+
+
+class RetryPolicy:
+    """Exponential backoff; each delay is jittered between half and all of its ceiling."""
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, kind, attempt):
+        return kind in RETRYABLE and attempt + 1 < self.max_attempts
+
+    def delay(self, attempt, kind=None):
+        ceiling = min(self.max_delay, self.base_delay * 2 ** attempt)
+        if kind == QUOTA:
+            ceiling = self.max_delay # Quota windows are per minute; short waits just burn attempts
+        return random.uniform(ceiling / 2, ceiling)
+
+
+class CircuitBreaker:
+    """Opens when the recent error rate spikes and holds every caller until `cooldown` has passed.
+
+    After the cooldown one probe call goes through (half-open); its outcome closes
+    the breaker again or re-opens it for another cooldown.
+    """
+
+    def __init__(self, window=20, min_calls=5, threshold=0.5, cooldown=30.0, clock=time.monotonic):
+        self.outcomes = collections.deque(maxlen=window)
+        self.min_calls = min_calls
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def _seconds_until_allowed(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 0.0
+            remaining = self.opened_at + self.cooldown - self.clock()
+            if remaining > 0:
+                return remaining
+            if self.probing:
+                return min(1.0, self.cooldown) # Someone else is probing; check back shortly
+            self.probing = True
+            return 0.0
+
+    def wait(self):
+        while (remaining := self._seconds_until_allowed()) > 0:
+            time.sleep(remaining)
+
+    async def wait_async(self):
+        while (remaining := self._seconds_until_allowed()) > 0:
+            await asyncio.sleep(remaining)
+
+    def record(self, success):
+        with self.lock:
+            if self.opened_at is not None and self.probing:
+                self.probing = False
+                if success:
+                    self.opened_at = None
+                    self.outcomes.clear()
+                else:
+                    self.opened_at = self.clock()
+                return
+            self.outcomes.append(success)
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.threshold:
+                self.opened_at = self.clock()
+
+    def state(self):
+        """Returns (state, seconds left in the cooldown); state is closed, open or half-open."""
+        with self.lock:
+            if self.opened_at is None:
+                return "closed", 0.0
+            remaining = self.opened_at + self.cooldown - self.clock()
+            return ("open", remaining) if remaining > 0 else ("half-open", 0.0)
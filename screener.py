@@ -0,0 +1,417 @@
+import asyncio
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import google.generativeai as genai
+import pypdf
+from pypdf import PdfReader
+
+from counters import counted
+from prompt_budget import RESUME_TOKENS, fit_job_description, fit_resume
+from rate_limiter import estimate_tokens
+from response_cache import cache_key
+from response_schema import BATCH_SCHEMA, RESPONSE_SCHEMA, STATS, finish, reask_prompt, repair_json, validate_analysis
+from retry import MALFORMED, TIMEOUT, RetryPolicy, ScoringFailed, classify_error
+
+MODEL_NAME = "gemini-1.5-flash"
+GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": RESPONSE_SCHEMA}
+BATCH_CONFIG = {"response_mime_type": "application/json", "response_schema": BATCH_SCHEMA}
+REASK_CONFIG = {"response_mime_type": "application/json"} # Only some fields come back, so no schema
+PROMPT_VERSION = 2 # Bump whenever build_prompt changes, so cached responses are not reused
+EMAIL_CONFIG = {"max_output_tokens": 400} # Plain text; an invite never needs more
+EMAIL_PROMPT_VERSION = 2 # Same, for build_polish_prompt
+MAX_IN_FLIGHT = 5 # Concurrent Gemini requests per batch
+EXTRACT_TIMEOUT = 30 # Seconds a worker spends on a single PDF before giving up on it
+EXTRACT_GRACE = 5 # Seconds past the timeout before a worker that ignored it is killed
+EXTRACT_PROCESSES = os.cpu_count() or 1
+RETRY_POLICY = RetryPolicy()
+MAX_RESUME_CHARS = 40_000 # ~10k tokens; pages past this budget are never parsed
+# Bump the number whenever read_pdf changes
+EXTRACTOR_VERSION = f"pypdf-{pypdf.__version__}/2/{MAX_RESUME_CHARS}"
+# List prices (USD per token) of MODEL_NAME for prompts up to 128k tokens, for pre-run estimates
+INPUT_PRICE = 0.075 / 1_000_000
+OUTPUT_PRICE = 0.30 / 1_000_000
+OUTPUT_TOKENS = 150 # Typical analysis reply
+TOKENS_PER_PAGE = 700 # Typical resume page, for files not read yet
+
+# --- PDF ---
+def iter_pdf_pages(pdf_reader):
+    """Extracts pages lazily, so callers that stop early skip parsing the rest."""
+    for page in pdf_reader.pages:
+        yield page.extract_text() or ""
+
+def read_pdf(pdf_file, max_chars=MAX_RESUME_CHARS):
+    """Returns {"text", "pages_read", "pages_total"}, stopping once `max_chars` is reached."""
+    try:
+        pdf_reader = PdfReader(pdf_file)
+        pages = []
+        size = 0
+        for page_text in iter_pdf_pages(pdf_reader):
+            pages.append(page_text[:max_chars - size])
+            size += len(pages[-1])
+            if size >= max_chars:
+                break
+        return {"text": "".join(pages), "pages_read": len(pages), "pages_total": len(pdf_reader.pages)}
+    except Exception:
+        return None
+
+def page_count(data):
+    """Pages of a PDF without extracting any text; 0 when it cannot be read."""
+    try:
+        return len(PdfReader(io.BytesIO(data)).pages)
+    except Exception:
+        return 0
+
+class ExtractionTimeout(BaseException):
+    """Raised by a worker's alarm; not an Exception, so no except clause in pypdf swallows it."""
+
+def _expired(signum, frame):
+    raise ExtractionTimeout()
+
+def extract_from_bytes(data, max_chars=MAX_RESUME_CHARS, timeout=None):
+    """Worker entry point: raw PDF bytes in, read_pdf() result (or None) out.
+
+    With `timeout` an alarm (POSIX only) stops a PDF that takes longer, so the
+    worker is free for the next file; the caller gets TimeoutError.
+    """
+    if not timeout or not hasattr(signal, "setitimer"):
+        return read_pdf(io.BytesIO(data), max_chars)
+    signal.signal(signal.SIGALRM, _expired)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return read_pdf(io.BytesIO(data), max_chars)
+    except ExtractionTimeout:
+        raise TimeoutError(f"extraction took over {timeout}s") from None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = weakref.WeakKeyDictionary() # event loop -> asyncio.Semaphore, one extraction per pool worker
+
+def get_extraction_pool():
+    """pypdf is pure Python, so extraction gets one process per core."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the Streamlit server process is multi-threaded
+            _pool = ProcessPoolExecutor(EXTRACT_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def _replace_pool(pool, kill=False):
+    """Stops handing out `pool`; with `kill` its workers are killed, failing their other files with BrokenProcessPool."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    if kill:
+        # ProcessPoolExecutor cannot stop a single worker (before Python 3.14)
+        for process in list((pool._processes or {}).values()):
+            process.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _loop_slots():
+    """The running loop's extraction semaphore; the app's jobs all extract on the one shared loop."""
+    loop = asyncio.get_running_loop()
+    slots = _slots.get(loop)
+    if slots is None:
+        slots = _slots.setdefault(loop, asyncio.Semaphore(EXTRACT_PROCESSES))
+    return slots
+
+def shutdown_extraction_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+async def _extract_in_pool(data, timeout):
+    for attempt in range(2):
+        pool = get_extraction_pool()
+        future = pool.submit(extract_from_bytes, data, MAX_RESUME_CHARS, timeout)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout + EXTRACT_GRACE)
+        except BrokenProcessPool:
+            _replace_pool(pool) # Another file's stuck worker was killed (or this PDF crashed one): try once more
+        except (TimeoutError, asyncio.TimeoutError, ExtractionTimeout) as exc:
+            if not future.done():
+                _replace_pool(pool, kill=True) # The worker ignored its alarm and would hold a slot for good
+            raise ScoringFailed(TIMEOUT, exc) from exc
+        except Exception:
+            return None
+    return None
+
+async def extract_async(data, timeout=EXTRACT_TIMEOUT, text_cache=None):
+    """read_pdf() result of the PDF bytes, or None when unreadable; raises ScoringFailed(TIMEOUT) when it took too long.
+
+    Only as many files as the pool has workers are submitted at a time from each event loop, so the timeout
+    runs from when a worker starts on the file, not from when it joined the queue.
+    A timed-out file is worth retrying later, unlike an unreadable one.
+    """
+    if text_cache:
+        # Hashing the PDF and the file I/O stay off the event loop, which other jobs share
+        extraction = await asyncio.to_thread(text_cache.get, data)
+        if extraction is not None:
+            return extraction
+    async with _loop_slots():
+        extraction = await _extract_in_pool(data, timeout)
+    if text_cache and extraction and extraction["text"]:
+        await asyncio.to_thread(text_cache.put, data, extraction)
+    return extraction
+
+# --- GEMINI ---
+# The fixed part of every prompt; context caching registers it once per batch
+INSTRUCTIONS = """
+    Act as a Technical Recruiter. Analyze this resume against the JD.
+    Return a valid JSON object with these exact keys:
+    {
+        "candidate_name": "Name or 'Unknown'",
+        "match_score": 0,  // Integer 0-100
+        "years_experience": "Estimate from text",
+        "key_skills": ["Skill1", "Skill2", "Skill3"],
+        "summary": "2 sentence executive summary",
+        "red_flags": "Any concerns or 'None'"
+    }
+"""
+
+def build_prompt(resume_text, job_description):
+    return INSTRUCTIONS + f"""
+    RESUME: {resume_text}
+    JOB DESC: {job_description}
+    """
+
+def budget_prompt(resume_text, job_description):
+    """build_prompt() with both sections held to their prompt_budget limits, and a list of what was cut."""
+    resume_text, cuts = fit_resume(resume_text)
+    job_description, jd_cuts = fit_job_description(job_description)
+    return build_prompt(resume_text, job_description), cuts + [f"JD: {cut}" for cut in jd_cuts]
+
+def estimate_run(resume_tokens, job_description, calls=0):
+    """(input tokens, output tokens, USD) to score resumes of the given token counts, before any call is made.
+
+    With `calls` only that many (top K) are scored; the longest ones are assumed, so
+    this is an upper bound that batching and context caching only bring down.
+    """
+    resume_tokens = sorted((min(tokens, RESUME_TOKENS) for tokens in resume_tokens), reverse=True)[:calls or None]
+    per_call = estimate_tokens(build_prompt("", fit_job_description(job_description)[0]))
+    input_tokens = sum(resume_tokens) + per_call * len(resume_tokens)
+    output_tokens = OUTPUT_TOKENS * len(resume_tokens)
+    return input_tokens, output_tokens, input_tokens * INPUT_PRICE + output_tokens * OUTPUT_PRICE
+
+# Drafts come from email_templates; Gemini only rewrites one when a recruiter asks for it
+def build_polish_prompt(draft, candidate, job_description):
+    return f"""
+    Act as a Technical Recruiter. Polish this email to a candidate so it reads warm and specific to them.
+    Keep every fact, name and request in it and keep it short. Reply with the email text only.
+    EMAIL: {draft}
+    CANDIDATE: {candidate['candidate_name']}
+    SUMMARY: {candidate['summary']}
+    KEY SKILLS: {', '.join(candidate['key_skills'])}
+    JOB DESC: {job_description}
+    """
+
+_transport = None
+_models = {}
+_models_lock = threading.Lock()
+
+def configure(api_key, transport=None, api_endpoint=None):
+    """Configures the SDK; call once per process.
+
+    Every genai.configure() throws away the SDK's cached clients, and with them
+    the open gRPC channel / HTTP keep-alive pool.
+    """
+    global _transport
+    client_options = {"api_endpoint": api_endpoint} if api_endpoint else None
+    genai.configure(api_key=api_key, transport=transport, client_options=client_options)
+    _transport = transport
+    with _models_lock:
+        _models.clear()
+
+def get_model(model_name=MODEL_NAME, generation_config=GENERATION_CONFIG):
+    """Process-wide GenerativeModel per (model, generation config), reusing the SDK's client."""
+    key = (model_name, json.dumps(generation_config, sort_keys=True))
+    with _models_lock:
+        if key not in _models:
+            _models[key] = genai.GenerativeModel(model_name, generation_config=generation_config)
+        return _models[key]
+
+async def generate_async(model, prompt):
+    if _transport == "rest":
+        # The SDK's async client is gRPC-only; run REST calls on a worker thread instead
+        return await asyncio.to_thread(model.generate_content, prompt)
+    return await model.generate_content_async(prompt)
+
+def _record_usage(limiter, estimated, response):
+    if limiter:
+        usage = getattr(response, "usage_metadata", None)
+        limiter.record_usage(estimated, getattr(usage, "total_token_count", None))
+
+def response_key(resume_text, job_description):
+    return cache_key(resume_text, job_description, PROMPT_VERSION, MODEL_NAME, GENERATION_CONFIG)
+
+def email_key(draft, candidate, job_description):
+    about = json.dumps([draft, candidate['candidate_name'], candidate['summary'], candidate['key_skills']])
+    return cache_key(about, job_description, f"email-{EMAIL_PROMPT_VERSION}", MODEL_NAME, EMAIL_CONFIG)
+
+def _failed(exc, attempt, breaker, policy):
+    """Books a failed attempt; returns the backoff delay, or raises ScoringFailed when out of retries."""
+    kind = classify_error(exc)
+    policy = policy or RETRY_POLICY # Looked up at call time so scripts can swap the module default
+    if breaker:
+        breaker.record(False)
+    if not policy.should_retry(kind, attempt):
+        raise ScoringFailed(kind, exc) from exc
+    return policy.delay(attempt, kind)
+
+async def validated_async(data, prompt, limiter=None, breaker=None, policy=None):
+    """`data` checked against the schema; fields that fail are asked for once more with the inline `prompt`.
+
+    Fields still invalid after that get response_schema.DEFAULTS; raises ScoringFailed
+    when match_score is among them, since the candidate could not be ranked.
+    """
+    data, errors = validate_analysis(data)
+    if errors:
+        STATS.add("reasked")
+        try:
+            reply = await call_gemini_async(
+                reask_prompt(prompt, errors), limiter, breaker, policy, model=get_model(MODEL_NAME, REASK_CONFIG)
+            )
+            fixed, errors = validate_analysis(reply, errors)
+            data.update(fixed)
+        except ScoringFailed:
+            pass # Judged on what the first reply had
+    return _finished(data, errors)
+
+def _finished(data, errors):
+    try:
+        return finish(data, errors)
+    except ValueError as exc:
+        raise ScoringFailed(MALFORMED, exc) from exc
+
+def _with_cuts(data, cuts):
+    if cuts:
+        data['prompt_cuts'] = cuts
+    return data
+
+async def analyze_candidate_json_async(resume_text, job_description, limiter=None, semaphore=None, response_cache=None,
+                                       breaker=None, policy=None):
+    """Asks Gemini for a JSON response to allow sorting/filtering; `semaphore` bounds how many calls are in flight.
+
+    Transient errors are retried with backoff; raises ScoringFailed once they run out.
+    Text over its token budget is trimmed first; what was cut is listed under 'prompt_cuts'.
+    Pipeline._call_one is the same call with context caching and batching around it.
+    """
+    prompt, cuts = budget_prompt(resume_text, job_description)
+    if response_cache:
+        key = response_key(resume_text, job_description)
+        data = await asyncio.to_thread(response_cache.get, key)
+        if data is not None:
+            return _with_cuts(data, cuts)
+    async with semaphore or asyncio.Semaphore(1):
+        data = await validated_async(await call_gemini_async(prompt, limiter, breaker, policy), prompt, limiter, breaker, policy)
+    if response_cache:
+        await asyncio.to_thread(response_cache.put, key, data)
+    return _with_cuts(data, cuts)
+
+async def call_gemini_async(prompt, limiter=None, breaker=None, policy=None, context=None, model=None, parse=repair_json):
+    """One prompt through the rate limiter, breaker and retry loop; returns the parsed reply or raises ScoringFailed.
+
+    With a context_cache.JobContext the prompt goes to its cached-content model.
+    """
+    model = model or (context.model if context else get_model())
+    estimated = estimate_tokens(prompt)
+    for attempt in itertools.count():
+        if breaker:
+            await breaker.wait_async()
+        if limiter:
+            await limiter.acquire_async(estimated)
+        try:
+            response = await generate_async(model, prompt)
+            _record_usage(limiter, estimated, response)
+            if context:
+                context.record(response)
+            data = parse(response.text)
+            break
+        except Exception as e:
+            await asyncio.sleep(_failed(e, attempt, breaker, policy))
+    if breaker:
+        breaker.record(True)
+    return data
+
+async def polish_email_async(draft, candidate, job_description, limiter=None, breaker=None, response_cache=None,
+                             policy=None):
+    """Gemini's rewrite of a template-rendered `draft`, cached per draft and candidate; raises ScoringFailed."""
+    if response_cache:
+        key = email_key(draft, candidate, job_description)
+        data = await asyncio.to_thread(response_cache.get, key)
+        if data is not None:
+            return data['email_draft']
+    email = await call_gemini_async(
+        build_polish_prompt(draft, candidate, job_description), limiter, breaker, policy,
+        model=get_model(MODEL_NAME, EMAIL_CONFIG), parse=str.strip,
+    )
+    if response_cache:
+        await asyncio.to_thread(response_cache.put, key, {'email_draft': email})
+    return email
+
+# --- BATCH RUNNER ---
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_event_loop():
+    """One long-lived loop in a daemon thread.
+
+    The SDK's async client binds to the loop it was first used on, so a fresh
+    asyncio.run() per Streamlit rerun would break every batch after the first.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="gemini-loop", daemon=True).start()
+    return _loop
+
+async def score_extraction_async(extraction, job_description, limiter=None, semaphore=None,
+                                 response_cache=None, breaker=None):
+    data = await analyze_candidate_json_async(
+        extraction["text"], job_description, limiter, semaphore, response_cache, breaker
+    )
+    if data:
+        data['pages_read'] = extraction["pages_read"]
+        data['pages_total'] = extraction["pages_total"]
+    return data
+
+def extract_batch(files, timeout=EXTRACT_TIMEOUT, text_cache=None, counters=None):
+    """Schedules extraction of every (key, pdf_bytes) pair; futures resolve to read_pdf() results or None.
+
+    A future raises ScoringFailed(TIMEOUT) when its PDF took longer than `timeout`.
+    Text cache hits and misses are added to `counters` when given.
+    """
+    loop = get_event_loop()
+    return {
+        asyncio.run_coroutine_threadsafe(counted(counters, extract_async(data, timeout, text_cache)), loop): key
+        for key, data in files
+    }
+
+def analyze_pairs(items, limiter=None, max_in_flight=MAX_IN_FLIGHT, response_cache=None, breaker=None):
+    """Schedules scoring of every (key, extraction, job_description) item and returns {future: key}.
+
+    Pairs found in `response_cache` cost no API call. Iterate with
+    concurrent.futures.as_completed(); a future raises ScoringFailed when Gemini
+    kept failing for that pair.
+    """
+    loop = get_event_loop()
+    semaphore = asyncio.Semaphore(max_in_flight)
+    futures = {}
+    for key, extraction, job_description in items:
+        coro = score_extraction_async(extraction, job_description, limiter, semaphore, response_cache, breaker)
+        futures[asyncio.run_coroutine_threadsafe(coro, loop)] = key
+    return futures
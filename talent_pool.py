@@ -0,0 +1,194 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_DIR = os.path.join(".cache", "talent_pool")
+ANN_THRESHOLD = 50_000 # Rows before search switches from brute force to the IVF index
+REBUILD_FRACTION = 0.1 # Rebuild the index once this share of rows was added after it
+
+
+class TalentPool:
+    """Every screened resume's text and embedding, kept across sessions.
+
+    Embeddings live in one append-only float32 file that is read through np.memmap;
+    metadata (and the text) lives in SQLite. The metadata row count is the source of
+    truth, so vectors written by an append that crashed before committing are ignored
+    and later overwritten.
+
+    Past ANN_THRESHOLD rows an IVF index is built on a background thread after an
+    append (or the first search); searches brute-force until it is ready, so no
+    query waits for a build.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, embedder_name=""):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(directory, "pool.sqlite3"), check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS candidates ("
+            "row INTEGER PRIMARY KEY, content_hash TEXT UNIQUE NOT NULL, filename TEXT, "
+            "candidate_name TEXT, text TEXT, added REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+        self.embedder_name = embedder_name
+        self.dim = self._setting("dim", int)
+        stored = self._setting("embedder")
+        if stored and embedder_name and stored != embedder_name:
+            raise ValueError(f"Talent pool in {directory} holds {stored} embeddings, not {embedder_name}")
+        self.ivf = None
+        self.building = False
+
+    def _setting(self, key, cast=str):
+        row = self.conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return cast(row[0]) if row else None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+
+    def missing(self, content_hashes):
+        """The subset of `content_hashes` not in the pool yet, so callers only embed new resumes."""
+        known = set()
+        hashes = list(content_hashes)
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            known.update(row[0] for row in self.conn.execute(
+                f"SELECT content_hash FROM candidates WHERE content_hash IN ({placeholders})", chunk
+            ))
+        return [h for h in hashes if h not in known]
+
+    def add(self, records, vectors):
+        """Appends records ({content_hash, filename, candidate_name, text}) with their normalized vectors."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self.lock:
+            new = set(self.missing(record["content_hash"] for record in records))
+            keep = [i for i, record in enumerate(records) if record["content_hash"] in new]
+            if not keep:
+                return 0
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self.conn.execute("INSERT OR REPLACE INTO settings VALUES ('dim', ?)", (str(self.dim),))
+                self.conn.execute("INSERT OR REPLACE INTO settings VALUES ('embedder', ?)", (self.embedder_name,))
+            start = len(self)
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(start * self.dim * 4) # Drop vectors left behind by an uncommitted append
+                f.write(vectors[keep].tobytes())
+            now = time.time()
+            self.conn.executemany(
+                "INSERT INTO candidates (row, content_hash, filename, candidate_name, text, added) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (start + n, records[i]["content_hash"], records[i]["filename"], records[i]["candidate_name"],
+                     records[i]["text"], now)
+                    for n, i in enumerate(keep)
+                ],
+            )
+            self.conn.commit()
+        self._refresh_index(start + len(keep))
+        return len(keep)
+
+    def _matrix(self, rows):
+        if not rows:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+
+    def search(self, query_vector, k=20, nprobe=8):
+        """Top-k candidates by cosine similarity, as dicts with a 0-100 `similarity`."""
+        rows = len(self)
+        if not rows:
+            return []
+        matrix = self._matrix(rows)
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        self._refresh_index(rows)
+        ivf = self.ivf
+        if ivf is not None and rows >= ANN_THRESHOLD:
+            candidates = ivf.candidates(query_vector, nprobe, rows)
+            scores = matrix[candidates] @ query_vector
+        else:
+            candidates = np.arange(rows)
+            scores = matrix @ query_vector
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return self._describe(candidates[top], scores[top])
+
+    def _describe(self, rows, scores):
+        placeholders = ",".join("?" * len(rows))
+        meta = {
+            row[0]: row for row in self.conn.execute(
+                f"SELECT row, filename, candidate_name, added FROM candidates WHERE row IN ({placeholders})",
+                [int(r) for r in rows],
+            )
+        }
+        return [
+            {
+                "candidate_name": meta[int(row)][2],
+                "filename": meta[int(row)][1],
+                "similarity": round(float(score) * 100, 1),
+                "added": time.strftime("%Y-%m-%d", time.localtime(meta[int(row)][3])),
+            }
+            for row, score in zip(rows, scores)
+        ]
+
+    # --- IVF (inverted file) index ---
+    def _refresh_index(self, rows):
+        """Starts a background build when the pool is big enough and the index missing or stale."""
+        with self.lock:
+            if rows < ANN_THRESHOLD or self.building:
+                return
+            if self.ivf is not None and rows - self.ivf.rows <= REBUILD_FRACTION * self.ivf.rows:
+                return
+            self.building = True
+        threading.Thread(target=self._build_index, args=(rows,), name="talent-pool-index", daemon=True).start()
+
+    def _build_index(self, rows):
+        try:
+            ivf = IVFIndex.build(self._matrix(rows))
+            with self.lock:
+                self.ivf = ivf # A stale index stays usable meanwhile: rows added after it are always scanned
+        finally:
+            with self.lock:
+                self.building = False
+
+
+class IVFIndex:
+    """Coarse k-means partition of the pool; a query only scans the `nprobe` closest lists."""
+
+    def __init__(self, centroids, order, offsets, rows):
+        self.centroids = centroids
+        self.order = order # Row ids sorted by list
+        self.offsets = offsets # order[offsets[c]:offsets[c + 1]] are the rows of list c
+        self.rows = rows
+
+    @classmethod
+    def build(cls, matrix, iterations=8, sample=20_000, seed=0):
+        rows = len(matrix)
+        n_lists = max(1, int(np.sqrt(rows)))
+        rng = np.random.default_rng(seed)
+        training = np.asarray(matrix[np.sort(rng.choice(rows, min(sample, rows), replace=False))])
+        centroids = training[rng.choice(len(training), n_lists, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(training @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = training[assignment == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[c] = centroid / (np.linalg.norm(centroid) or 1)
+        assignment = np.concatenate([
+            np.argmax(np.asarray(matrix[start:start + 10_000]) @ centroids.T, axis=1)
+            for start in range(0, rows, 10_000)
+        ])
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=n_lists))))
+        return cls(centroids, order, offsets, rows)
+
+    def candidates(self, query_vector, nprobe, rows):
+        probes = np.argsort(-(self.centroids @ query_vector))[:nprobe]
+        indexed = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probes])
+        # Rows appended since the build are not in any list yet, so always scan them
+        return np.concatenate((indexed, np.arange(self.rows, rows)))
@@ -0,0 +1,53 @@
+import threading
+
+import screener
+from bench.corpus import generate
+from bench.mock_gemini import MockGeminiServer
+from dedup import exact_duplicates
+from jobs import Job, Services, _attach_duplicates, screen_files, unique_names
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from retry import CircuitBreaker
+from text_cache import TextCache
+
+
+def test_repeated_names_are_numbered():
+    files = [("resume.pdf", b"a"), ("cv.pdf", b"b"), ("resume.pdf", b"c"), ("resume (3).pdf", b"d")]
+    assert [name for name, _ in unique_names(files)] == ["resume.pdf", "cv.pdf", "resume (4).pdf", "resume (3).pdf"]
+
+
+def test_a_file_is_never_a_copy_of_itself():
+    files = [("resume.pdf", b"a"), ("resume.pdf", b"b")]
+    unique, copies = exact_duplicates(files, {"resume.pdf": "same"})
+    assert copies == {}
+    assert unique == [("resume.pdf", b"a")]
+
+
+def test_copy_cycles_do_not_hang():
+    job = Job('files', 3)
+    job.results = [{'filename': "a.pdf"}, {'filename': "d.pdf"}]
+    job.copies = {"a.pdf": "a.pdf", "b.pdf": "c.pdf", "c.pdf": "b.pdf", "e.pdf": "d.pdf"}
+    _attach_duplicates(job)
+    assert 'duplicate_files' not in job.results[0]
+    assert job.results[1]['duplicate_files'] == ["e.pdf"]
+
+
+def test_different_resumes_with_one_name_are_both_scored(tmp_path):
+    server = MockGeminiServer(latency=0.01).start()
+    try:
+        screener.configure("test", transport="rest", api_endpoint=server.url)
+        services = Services(
+            RateLimiter(1000, 10**8), CircuitBreaker(),
+            TextCache(str(tmp_path / "text")), ResponseCache(str(tmp_path / "responses.sqlite3")),
+        )
+        files = [("resume.pdf", data) for _, data in generate(2, 1, 1, seed=3)]
+        job = Job('files', len(files), "Python")
+        worker = threading.Thread(target=screen_files, args=(job, files, "Python", services), daemon=True)
+        worker.start()
+        worker.join(60)
+        assert not worker.is_alive()
+        assert job.copies == {}
+        assert sorted(row['filename'] for row in job.results) == ["resume (2).pdf", "resume.pdf"]
+    finally:
+        screener.shutdown_extraction_pool()
+        server.stop()
@@ -0,0 +1,43 @@
+from prompt_budget import TRUNCATED, fit, fit_resume
+from rate_limiter import estimate_tokens
+
+
+def test_text_within_budget_is_untouched():
+    text = "Jane Doe\nExperience\nPython developer, 2019 - 2023"
+    assert fit_resume(text, budget=100) == (text, [])
+
+
+def test_result_fits_budget():
+    text = "\n".join(f"Built service {i} in Python and Go" for i in range(2000))
+    fitted, cuts = fit_resume(text, budget=500)
+    assert estimate_tokens(fitted) <= 500
+    assert fitted.endswith(TRUNCATED)
+    assert cuts[-1].startswith("end of text")
+
+
+def test_long_unbroken_line_is_cut_at_the_limit():
+    text = "Jane Doe\nExperience\n" + "Python SQL Docker " * 2000
+    fitted, _ = fit_resume(text, budget=1000)
+    assert estimate_tokens(fitted) > 900
+
+
+def test_cut_backs_off_to_a_nearby_line_end():
+    text = "\n".join(f"{i:04d} " + "x" * 45 for i in range(200))
+    fitted, _ = fit_resume(text, budget=1000)
+    assert fitted[:-len(TRUNCATED) - 1].endswith("x" * 45)
+
+
+def test_years_are_not_taken_for_page_numbers():
+    text = "Jane Doe\nAcme Corp\n2019\n2023\n" + "\n".join(f"Page {i} of 40" for i in range(1, 41))
+    fitted, cuts = fit(text, budget=10)
+    assert "2019\n2023" in fitted
+    assert "Page 3 of 40" not in fitted
+    assert cuts[0] == "40 repeated header, footer and page-number lines"
+
+
+def test_low_value_section_goes_before_the_tail():
+    text = "Experience\n" + "Python " * 100 + "\nReferences\n" + "Available on request " * 300
+    fitted, cuts = fit_resume(text, budget=300)
+    assert "Available on request" not in fitted
+    assert not fitted.endswith(TRUNCATED)
+    assert cuts[0].startswith("references")
@@ -0,0 +1,100 @@
+import pytest
+
+from response_schema import DEFAULTS, finish, repair_json, validate_analysis
+
+
+@pytest.mark.parametrize("reply, expected", [
+    ('{"candidate_name": "Jane", "match_score": 85}', {"candidate_name": "Jane", "match_score": 85}),
+    ('{"match_score": 85, "key_skills": ["Go", "SQL",],}', {"match_score": 85, "key_skills": ["Go", "SQL"]}),
+    ('{"match_score": 85%}', {"match_score": 85}),
+    ('{"match_score": 72.5 %, "summary": "ok"}', {"match_score": 72.5, "summary": "ok"}),
+    ('```json\n{"match_score": 85}\n```', {"match_score": 85}),
+    ('```\n{"match_score": 85}\n```', {"match_score": 85}),
+    # Cut off inside a key
+    ('{"candidate_name": "Jane", "match_sc', {"candidate_name": "Jane"}),
+    ('{"candidate_name": "Jane", "', {"candidate_name": "Jane"}),
+    # Cut off inside a string, including one with commas and colons of its own
+    ('{"candidate_name": "Ja', {"candidate_name": "Ja"}),
+    ('{"summary": "Led a team, shipped', {"summary": "Led a team, shipped"}),
+    ('{"summary": "Note: gaps in 2019, 2020", "red_fl', {"summary": "Note: gaps in 2019, 2020"}),
+    ('{"summary": "He said \\"hi', {"summary": 'He said "hi'}),
+    # Cut off inside an array
+    ('{"key_skills": ["Python", "SQ', {"key_skills": ["Python", "SQ"]}),
+    ('{"key_skills": ["Python",', {"key_skills": ["Python"]}),
+    ('{"key_skills": [', {"key_skills": []}),
+    # Cut off right after a colon
+    ('{"candidate_name": "Jane", "match_score":', {"candidate_name": "Jane", "match_score": None}),
+    ('{"candidate_name": "Jane", "match_score": ', {"candidate_name": "Jane", "match_score": None}),
+    # Cut off after a nested value
+    ('{"a": {"b": 1}, "c', {"a": {"b": 1}}),
+    ('[{"resume_id": "r1", "match_score": 80}, {"resume_id": "r2", "match', [
+        {"resume_id": "r1", "match_score": 80}, {"resume_id": "r2"},
+    ]),
+])
+def test_repair_json(reply, expected):
+    assert repair_json(reply) == expected
+
+
+@pytest.mark.parametrize("reply", ["", "not json", "Sorry, I cannot help with that."])
+def test_repair_json_gives_up_on_prose(reply):
+    with pytest.raises(ValueError):
+        repair_json(reply)
+
+
+@pytest.mark.parametrize("value, expected", [
+    (85, 85),
+    (85.6, 86),
+    ("85", 85),
+    ("85%", 85),
+    ("8/10", 80),
+    ("7.5/10", 75),
+    ("Score: 90 out of 100", 90),
+])
+def test_match_score_is_coerced(value, expected):
+    clean, errors = validate_analysis({"match_score": value}, ["match_score"])
+    assert errors == {}
+    assert clean["match_score"] == expected
+
+
+@pytest.mark.parametrize("value, error", [
+    (150, "out of range 0-100"),
+    (-1, "out of range 0-100"),
+    (True, "expected an integer"),
+    (None, "expected an integer"),
+    ("ninety", "expected an integer"),
+    ([85], "expected an integer"),
+])
+def test_unusable_match_score_is_an_error(value, error):
+    assert validate_analysis({"match_score": value}, ["match_score"]) == ({}, {"match_score": error})
+
+
+def test_fields_are_coerced_and_missing_ones_reported():
+    clean, errors = validate_analysis({
+        "candidate_name": " Jane Doe ", "match_score": 70, "years_experience": 6,
+        "key_skills": "Python, SQL; Go", "summary": "Solid.", "extra": 1,
+    })
+    assert clean == {
+        "candidate_name": "Jane Doe", "match_score": 70, "years_experience": "6",
+        "key_skills": ["Python", "SQL", "Go"], "summary": "Solid.", "extra": 1,
+    }
+    assert errors == {"red_flags": "missing"}
+
+
+def test_a_reply_that_is_no_object_fails_every_field():
+    clean, errors = validate_analysis(["Jane"])
+    assert clean == {}
+    assert set(errors) == set(DEFAULTS) | {"match_score"}
+
+
+def test_finish_fills_defaults():
+    data = finish({"match_score": 70}, {"key_skills": "missing", "red_flags": "expected a string"})
+    assert data == {"match_score": 70, "key_skills": [], "red_flags": "None"}
+
+
+@pytest.mark.parametrize("errors", [
+    {"match_score": "missing"},
+    {"match_score": "out of range 0-100", "summary": "missing"},
+])
+def test_finish_raises_without_a_usable_match_score(errors):
+    with pytest.raises(ValueError, match="match_score"):
+        finish({}, errors)
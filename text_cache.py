@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import threading
+
+from counters import count
+
+DEFAULT_DIR = os.path.join(".cache", "text")
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+EVICT_EVERY = 100 # Puts between full sweeps, which also pick up other processes' writes
+EVICT_TO = 0.9 # Share of max_bytes a sweep frees down to, so a full cache is not swept on every put
+
+
+class TextCache:
+    """Extraction results on disk, keyed by SHA-256 of the PDF bytes plus extractor version.
+
+    Values are anything JSON-serializable (the text plus its page counts).
+
+    Files are touched on every hit, so modification time doubles as the LRU order
+    when the directory grows past `max_bytes`. Its size is tracked in memory between
+    sweeps, so a put does not have to list the directory.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES, version=""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.size = None # Bytes on disk as of the last sweep, plus this process's puts since
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, data):
+        digest = hashlib.sha256(data)
+        digest.update(self.version.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, data):
+        path = self._path(self.key(data))
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            count("text_cache_misses")
+            return None
+        with self.lock:
+            self.hits += 1
+        count("text_cache_hits")
+        return value
+
+    def put(self, data, value):
+        path = self._path(self.key(data))
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+            size = f.tell()
+        try:
+            size -= os.stat(path).st_size # Overwriting an entry
+        except OSError:
+            pass
+        os.replace(tmp, path) # Atomic, so readers never see half a file
+        with self.lock:
+            self.puts += 1
+            if self.size is not None:
+                self.size += size
+            sweep = self.size is None or self.size > self.max_bytes or self.puts % EVICT_EVERY == 0
+        if sweep:
+            self.evict()
+
+    def evict(self):
+        """Deletes least recently used entries once the cache is over max_bytes, down to EVICT_TO of it."""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_bytes * EVICT_TO:
+                    break
+        with self.lock:
+            self.size = total
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}